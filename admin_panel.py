@@ -6,6 +6,22 @@ from pathlib import Path
 from datetime import datetime
 import shutil
 
+from procesamiento import (CONCEPTOS, a_meses, agregar_derivados, convertir_fecha_español, formatear_monto,
+                           granularidad, leer_excel, leer_excel_cacheado, leer_excel_detalle,
+                           obtener_archivo_cliente, version_datos)
+from analitica import (METRICAS, actualizar_benchmark, actualizar_benchmark_cliente, calcular_benchmark,
+                       cargar_benchmark, cargar_frames, reagrupar_benchmark, versiones_clientes)
+from metricas import guardar_metricas_incrementales
+from diferencias import comparar, meses_afectados, resumen as resumen_diferencias
+from proyecciones import CONCEPTOS_PROYECCION, HORIZONTE_MAX, proyectar
+from inflacion import actualizar_ipc_indec, cargar_ipc, deflactar, guardar_ipc, meses_base, version_ipc
+from compactacion import (cargar_manifiesto, compactar_cliente, compactar_todos, describir_liberado,
+                          obtener_retencion)
+from alertas import (actualizar_alertas, actualizar_alertas_cliente, cargar_alertas, clientes_con_atencion,
+                     obtener_umbrales)
+from cache_disco import estadisticas as estadisticas_cache, vaciar as vaciar_cache
+from documentos_masivos import guardar_lote, normalizar_cuit, planificar, resumen_reporte
+
 # Configuración
 st.set_page_config(page_title="Panel Administrativo", page_icon="⚙️", layout="wide")
 
@@ -24,31 +40,55 @@ def guardar_clientes(config):
         json.dump(config, f, indent=2, ensure_ascii=False)
 
 def procesar_excel(archivo):
+    """DataFrame de leer_excel, o None si el archivo no tiene el formato esperado"""
     try:
-        df = pd.read_excel(archivo, sheet_name=0, header=None)
-        fechas_raw = df.iloc[2, 2:].values
-        fechas = []
-        for fecha in fechas_raw:
-            if pd.notna(fecha):
-                if isinstance(fecha, datetime):
-                    fechas.append(fecha.strftime('%Y-%m'))
-                else:
-                    fechas.append(str(fecha)[:7])
-        
-        ventas = df.iloc[3, 2:2+len(fechas)].values
-        margen_operativo = df.iloc[7, 2:2+len(fechas)].values
-        
-        ventas_total = sum([v for v in ventas if pd.notna(v)])
-        margen_total = sum([m for m in margen_operativo if pd.notna(m)])
-        
-        return {
-            'meses': len(fechas),
-            'ventas_total': ventas_total,
-            'margen_operativo': margen_total
-        }
+        if isinstance(archivo, Path):
+            return leer_excel_cacheado(archivo)
+        return leer_excel(archivo)
     except Exception as e:
         return None
 
+def etiqueta_anonima(i):
+    """Etiqueta estilo planilla para el i-ésimo cliente anónimo: A…Z, AA, AB…"""
+    letras = ""
+    i += 1
+    while i:
+        i, resto = divmod(i - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+def error_cuit(cuit, config, codigo=None):
+    """Mensaje de error si el CUIT no tiene 11 dígitos o ya lo usa otro cliente (None si está bien)"""
+    digitos = normalizar_cuit(cuit)
+    if len(digitos) != 11:
+        return "❌ El CUIT debe tener 11 dígitos"
+    for otro, datos in config['clientes'].items():
+        if otro != codigo and datos.get('cuit') and normalizar_cuit(datos['cuit']) == digitos:
+            return f"❌ El CUIT ya está asignado a {datos['nombre']}"
+    return None
+
+@st.cache_data(show_spinner=False)
+def proyectar_clientes(versiones, horizonte):
+    """Proyección de todos los clientes en un solo ajuste.
+
+    ``versiones`` es una tupla de (codigo, version): la caché se invalida
+    cuando cambia el Excel de cualquier cliente.
+    """
+    codigos = {codigo for codigo, _ in versiones}
+    config_vigente = cargar_clientes()
+    config_vigente['clientes'] = {c: d for c, d in config_vigente['clientes'].items() if c in codigos}
+    return proyectar(cargar_frames(config_vigente), horizonte)
+
+@st.cache_data(show_spinner=False)
+def benchmark_constante(versiones, mes_base, version_tabla_ipc):
+    """Benchmark con los montos de todos los clientes en pesos constantes de ``mes_base``.
+
+    Se cachea por versiones de datos, mes base y versión de la tabla de IPC.
+    """
+    config_vigente = cargar_clientes()
+    frames = {codigo: deflactar(df, mes_base) for codigo, df in cargar_frames(config_vigente).items()}
+    return calcular_benchmark(config_vigente, frames)
+
 # Validar acceso
 query_params = st.query_params
 codigo_admin = query_params.get("admin", None)
@@ -66,12 +106,124 @@ st.markdown("**Gestión de Clientes y Documentos**")
 st.divider()
 
 # TABS
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["👥 Clientes", "📊 Subir Datos", "📁 Subir Documentos", "📈 Benchmarking", "➕ Nuevo Cliente"])
+tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["👥 Clientes", "📊 Subir Datos", "📁 Subir Documentos", "📈 Benchmarking",
+                                                   "🔮 Proyecciones", "🚨 Alertas", "➕ Nuevo Cliente"])
 
 # ============== TAB 1: CLIENTES ==============
 with tab1:
     st.markdown("### Lista de Clientes")
     
+    with st.expander("🗜️ Almacenamiento y retención de versiones"):
+        st.markdown("Las versiones viejas de datos pasan a un historial compacto (auditable: "
+                    "guarda valores y hash y, si se elige, el Excel original) y salen de la "
+                    "carpeta del cliente. El Excel vigente nunca se toca.")
+        retencion = obtener_retencion(config)
+        with st.form("retencion"):
+            modo = st.radio("Conservar:", ["Últimas N versiones", "Versiones de los últimos N meses"],
+                            index=1 if retencion.get('meses') else 0, horizontal=True)
+            cantidad = st.number_input("N:", min_value=1, max_value=120,
+                                       value=int(retencion.get('meses') or retencion.get('versiones') or 3))
+            originales = st.checkbox("Conservar también los Excel originales (no libera su espacio)",
+                                     value=retencion.get('originales', False))
+            automatica = st.checkbox("Compactar automáticamente al confirmar cada carga",
+                                     value=retencion.get('automatica', False))
+            col_sim, col_comp = st.columns(2)
+            simular = col_sim.form_submit_button("🔍 Simular")
+            compactar = col_comp.form_submit_button("🗜️ Guardar y Compactar", type="primary")
+        
+        if simular or compactar:
+            retencion = {'versiones': None, 'meses': int(cantidad)} if modo.startswith("Versiones de") \
+                else {'versiones': int(cantidad), 'meses': None}
+            retencion.update(originales=originales, automatica=automatica)
+            if compactar:
+                config['retencion'] = retencion
+                guardar_clientes(config)
+            reportes = compactar_todos(config, retencion, simular=simular)
+            if reportes:
+                total = sum(r['bytes_liberados'] for r in reportes)
+                st.dataframe(pd.DataFrame([{
+                    'Cliente': config['clientes'][r['codigo']]['nombre'],
+                    'Versiones compactadas': len(r['compactadas']),
+                    'No legibles (se conservan)': len(r['con_error']),
+                    'Espacio': describir_liberado(r['bytes_liberados']),
+                } for r in reportes]), use_container_width=True, hide_index=True)
+                if total > 0:
+                    st.success(f"{'Se liberarían' if simular else 'Se liberaron'} {total / 1024:,.1f} KB")
+                else:
+                    st.info(f"Total: {describir_liberado(total)}")
+            else:
+                st.info("No hay versiones para compactar con esta política")
+    
+    with st.expander("💾 Caché compartida"):
+        st.markdown("Datos procesados, métricas, proyecciones y gráficos que comparten todas las "
+                    "réplicas del dashboard en este servidor (indexados por el contenido de cada Excel).")
+        estado_cache = estadisticas_cache()
+        col1, col2 = st.columns(2)
+        col1.metric("Entradas", estado_cache['entradas'])
+        col2.metric("Tamaño", f"{estado_cache['bytes'] / 1024 / 1024:,.1f} MB")
+        if estado_cache['replicas']:
+            st.dataframe(pd.DataFrame([{
+                'Réplica': r['replica'],
+                'Aciertos': r['aciertos'],
+                'Fallos': r['fallos'],
+                'Tasa de aciertos': f"{r['tasa_aciertos']:.1f}%" if r['tasa_aciertos'] is not None else "-",
+                'Actualizado': r['actualizado'],
+            } for r in estado_cache['replicas']]), use_container_width=True, hide_index=True)
+        if st.button("🗑️ Vaciar caché"):
+            vaciar_cache()
+            st.success("Caché vaciada")
+            st.rerun()
+    
+    with st.expander("🏢 Grupos de empresas (holdings)"):
+        st.markdown("Un grupo tiene su propio link y muestra el consolidado de sus empresas "
+                    "(conceptos sumados, ratios recalculados y aporte de cada empresa).")
+        grupos = config.setdefault('grupos', {})
+        nombres_clientes = {codigo: cliente['nombre'] for codigo, cliente in config['clientes'].items()}
+        
+        for codigo_grupo, grupo in list(grupos.items()):
+            st.markdown(f"**{'🟢' if grupo.get('activo', True) else '🔴'} {grupo['nombre']}** (`{codigo_grupo}`)")
+            st.code(f"https://syntesys-clientes.streamlit.app?cliente={codigo_grupo}", language=None)
+            miembros = st.multiselect("Empresas:", options=list(nombres_clientes),
+                                      default=[c for c in grupo['miembros'] if c in nombres_clientes],
+                                      format_func=lambda c: nombres_clientes[c], key=f"miembros_{codigo_grupo}")
+            col1, col2, col3 = st.columns(3)
+            if col1.button("💾 Guardar empresas", key=f"guardar_grupo_{codigo_grupo}"):
+                grupo['miembros'] = miembros
+                guardar_clientes(config)
+                st.rerun()
+            if col2.button("🔴 Desactivar" if grupo.get('activo', True) else "🟢 Activar",
+                           key=f"activo_grupo_{codigo_grupo}"):
+                grupo['activo'] = not grupo.get('activo', True)
+                guardar_clientes(config)
+                st.rerun()
+            if col3.button("🗑️ Eliminar grupo", key=f"eliminar_grupo_{codigo_grupo}"):
+                del grupos[codigo_grupo]
+                guardar_clientes(config)
+                st.rerun()
+            st.divider()
+        
+        with st.form("nuevo_grupo"):
+            nombre_grupo = st.text_input("Nombre del grupo:", placeholder="Ej: Holding Norte")
+            codigo_grupo = st.text_input("Código único:", placeholder="Ej: holding_norte")
+            miembros = st.multiselect("Empresas:", options=list(nombres_clientes),
+                                      format_func=lambda c: nombres_clientes[c])
+            if st.form_submit_button("➕ Crear Grupo"):
+                if not nombre_grupo or not codigo_grupo or not miembros:
+                    st.error("❌ Completá el nombre, el código y al menos una empresa")
+                elif codigo_grupo in config['clientes'] or codigo_grupo in grupos:
+                    st.error(f"❌ El código '{codigo_grupo}' ya existe")
+                elif ' ' in codigo_grupo or not codigo_grupo.islower():
+                    st.error("❌ El código debe ser en minúsculas y sin espacios")
+                else:
+                    grupos[codigo_grupo] = {
+                        "nombre": nombre_grupo,
+                        "miembros": miembros,
+                        "activo": True,
+                        "fecha_alta": datetime.now().strftime('%Y-%m-%d')
+                    }
+                    guardar_clientes(config)
+                    st.rerun()
+    
     if config['clientes']:
         for codigo, cliente in config['clientes'].items():
             with st.expander(f"{'🟢' if cliente['activo'] else '🔴'} **{cliente['nombre']}** ({codigo})", expanded=False):
@@ -84,6 +236,34 @@ with tab1:
                     **Estado:** {'✅ Activo' if cliente['activo'] else '❌ Inactivo'}
                     """)
                     
+                    # Datos editables: la carga masiva de documentos asigna por CUIT y el
+                    # benchmarking compara primero contra el sector
+                    with st.form(f"datos_{codigo}"):
+                        sector_cliente = st.text_input("Sector:", value=cliente.get('sector', ''),
+                                                       placeholder="Ej: Petróleo y Gas", key=f"sector_{codigo}",
+                                                       help="Grupo de pares en el benchmarking (vacío: Sin sector)")
+                        cuit_cliente = st.text_input("CUIT:", value=cliente.get('cuit', ''),
+                                                     placeholder="Ej: 30-71234567-8", key=f"cuit_{codigo}",
+                                                     help="Se usa para asignar documentos en la carga masiva")
+                        if st.form_submit_button("💾 Guardar datos"):
+                            sector_cliente, cuit_cliente = sector_cliente.strip(), cuit_cliente.strip()
+                            error = error_cuit(cuit_cliente, config, codigo) if cuit_cliente else None
+                            if error:
+                                st.error(error)
+                            else:
+                                cambio_sector = sector_cliente != cliente.get('sector', '')
+                                for campo, valor in (('sector', sector_cliente), ('cuit', cuit_cliente)):
+                                    if valor:
+                                        config['clientes'][codigo][campo] = valor
+                                    else:
+                                        config['clientes'][codigo].pop(campo, None)
+                                guardar_clientes(config)
+                                if cambio_sector and cliente['activo']:
+                                    # Los grupos de pares se rearman con la ventana guardada
+                                    reagrupar_benchmark(config)
+                                    benchmark_constante.clear()
+                                st.rerun()
+                    
                     # Link de acceso
                     url_base = "https://syntesys-clientes.streamlit.app"
                     link_cliente = f"{url_base}?cliente={codigo}"
@@ -104,7 +284,9 @@ with tab1:
                             tiene_documentos = len(archivos_pdf) > 0
                     
                     if tiene_datos:
-                        st.success("📊 Datos cargados")
+                        compactadas = len(cargar_manifiesto(codigo)['versiones'])
+                        st.success(f"📊 Datos cargados ({len(archivos_xlsx)} versiones"
+                                   + (f", {compactadas} en historial)" if compactadas else ")"))
                     else:
                         st.warning("📊 Sin datos")
                     
@@ -131,6 +313,9 @@ with tab1:
                             if cliente_dir.exists():
                                 shutil.rmtree(cliente_dir)
                             del config['clientes'][codigo]
+                            for grupo in config.get('grupos', {}).values():
+                                if codigo in grupo['miembros']:
+                                    grupo['miembros'].remove(codigo)
                             guardar_clientes(config)
                             st.success(f"Cliente {cliente['nombre']} eliminado")
                             st.rerun()
@@ -161,13 +346,60 @@ with tab2:
             if archivo_subido:
                 st.markdown("#### 👀 Preview de Datos")
                 
-                info = procesar_excel(archivo_subido)
+                try:
+                    detalle = leer_excel_detalle(archivo_subido)
+                    df_nuevo = agregar_derivados(a_meses(detalle))
+                    error_lectura = None
+                except ValueError as e:
+                    # Fechas o meses repetidos: se informa cuáles
+                    df_nuevo, error_lectura = None, str(e)
+                except Exception:
+                    df_nuevo, error_lectura = None, None
                 
-                if info:
+                if df_nuevo is not None:
+                    granularidad_subida = granularidad(detalle)
+                    if granularidad_subida != 'mensual':
+                        st.info(f"Datos con granularidad **{granularidad_subida}**: {len(detalle):,} fechas, "
+                                f"sumadas a {len(df_nuevo)} meses. El cliente ve el detalle en '🔎 Por Período'.")
+                    
+                    # Versión vigente del cliente, para comparar mes a mes
+                    archivo_actual = obtener_archivo_cliente(codigo_sel)
+                    df_actual = procesar_excel(archivo_actual) if archivo_actual else None
+                    diferencias = comparar(df_nuevo, df_actual)
+                    cantidades = resumen_diferencias(diferencias)
+                    afectados = meses_afectados(diferencias)
+                    
                     col1, col2, col3 = st.columns(3)
-                    col1.metric("Meses", info['meses'])
-                    col2.metric("Ventas Totales", f"${info['ventas_total']/1_000_000:,.1f}M")
-                    col3.metric("Margen Operativo", f"${info['margen_operativo']/1_000_000:,.1f}M")
+                    col1.metric("Meses", len(df_nuevo))
+                    col2.metric("Ventas Totales", f"${df_nuevo['Ventas'].sum()/1_000_000:,.1f}M")
+                    col3.metric("Margen Operativo", f"${df_nuevo['Margen Operativo'].sum()/1_000_000:,.1f}M")
+                    
+                    col1, col2, col3, col4 = st.columns(4)
+                    col1.metric("🆕 Meses nuevos", cantidades['Nuevo'])
+                    col2.metric("✏️ Meses revisados", cantidades['Revisado'])
+                    col3.metric("🗑️ Meses que se quitan", cantidades['Eliminado'])
+                    col4.metric("Sin cambios", cantidades['Sin cambios'])
+                    
+                    if df_actual is None:
+                        st.info("Es la primera carga de este cliente: todos los meses son nuevos.")
+                    elif not afectados:
+                        st.info("El archivo no cambia ningún valor de la versión vigente.")
+                    else:
+                        st.markdown("##### Cambios respecto de la versión vigente")
+                        cambios = diferencias[diferencias['Estado'] != 'Sin cambios']
+                        tabla = pd.DataFrame({
+                            'Mes': cambios['Mes'].map(convertir_fecha_español),
+                            'Estado': cambios['Estado'],
+                        })
+                        for concepto in CONCEPTOS:
+                            tabla[concepto] = cambios[concepto]
+                            tabla[f"Δ {concepto}"] = cambios[f"Δ {concepto}"]
+                        formatos = {
+                            columna: (lambda v: "" if pd.isna(v) else f"{v:+,.0f}") if columna.startswith("Δ")
+                            else formatear_monto
+                            for columna in tabla.columns[2:]
+                        }
+                        st.dataframe(tabla.style.format(formatos), use_container_width=True, hide_index=True)
                     
                     st.divider()
                     
@@ -182,9 +414,31 @@ with tab2:
                         with open(ruta_destino, 'wb') as f:
                             f.write(archivo_subido.getbuffer())
                         
-                        st.success(f"✅ Datos guardados exitosamente para {cliente_seleccionado[1]}")
+                        if df_actual is not None:
+                            # Solo se recalculan los meses que cambiaron (antes de compactar la versión anterior)
+                            desde = afectados[0] if afectados else None
+                            guardar_metricas_incrementales(archivo_actual, ruta_destino, desde)
+                            if config['clientes'][codigo_sel]['activo']:
+                                df_guardado = leer_excel_cacheado(ruta_destino)
+                                actualizar_benchmark_cliente(config, codigo_sel, df_guardado, afectados)
+                                actualizar_alertas_cliente(config, codigo_sel, df_guardado,
+                                                           version_datos(ruta_destino), desde)
+                        else:
+                            # Primera carga: recalcular la comparación entre clientes y las alertas
+                            frames = cargar_frames(config)
+                            actualizar_benchmark(config, frames)
+                            actualizar_alertas(config, frames)
+                        
+                        # Pasar las versiones anteriores al historial, solo si la política lo pide
+                        retencion = obtener_retencion(config)
+                        if retencion['automatica']:
+                            compactar_cliente(codigo_sel, retencion)
+                        
+                        st.success(f"✅ Datos guardados exitosamente para {cliente_seleccionado[1]} "
+                                   f"({len(afectados)} meses recalculados)")
                 else:
-                    st.error("❌ Error al procesar el archivo. Verificá el formato.")
+                    st.error(f"❌ {error_lectura}" if error_lectura
+                             else "❌ Error al procesar el archivo. Verificá el formato.")
     else:
         st.warning("No hay clientes registrados. Creá uno primero.")
 
@@ -193,6 +447,44 @@ with tab3:
     st.markdown("### 📁 Subir Documentos PDF")
     st.markdown("Subí constancias de ARCA, certificados PyME y otros documentos para tus clientes.")
     
+    with st.expander("📦 Carga masiva (ZIP o varios PDFs)"):
+        st.markdown("Cada PDF se asigna al cliente cuyo **CUIT** o **código** aparece en el nombre del archivo "
+                    "(ej: `constancia_arca_30712345678.pdf`, `certificado_pyme_supply_petrolero.pdf`). "
+                    "También se puede incluir un `mapeo.csv` con columnas `archivo` y `cliente` (código o CUIT). "
+                    "El tipo se detecta por el nombre, igual que en el dashboard.")
+        archivos_lote = st.file_uploader("Subir PDFs, ZIP y/o mapeo.csv", type=['pdf', 'zip', 'csv'],
+                                         accept_multiple_files=True, key="docs_lote")
+        
+        if archivos_lote:
+            plan = planificar([(a.name, a.getvalue()) for a in archivos_lote], config)
+            asignados = [fila for fila in plan if fila['cliente']]
+            
+            st.dataframe(pd.DataFrame([{
+                'Archivo': fila['archivo'],
+                'Cliente': config['clientes'][fila['cliente']]['nombre'] if fila['cliente'] else "❌ Sin asignar",
+                'Tipo': fila['tipo'] or "-",
+                'Criterio': fila['criterio'] or fila['motivo'],
+            } for fila in plan]), use_container_width=True, hide_index=True)
+            
+            if asignados and st.button(f"✅ Guardar {len(asignados)} documentos", type="primary"):
+                reporte = guardar_lote(plan)
+                totales = resumen_reporte(reporte)
+                if totales['error']:
+                    st.warning(f"{totales['ok']} documentos guardados, {totales['error']} con error")
+                else:
+                    st.success(f"✅ {totales['ok']} documentos guardados")
+                tabla_reporte = pd.DataFrame([{
+                    'Archivo': r['archivo'],
+                    'Cliente': r['cliente'] or "-",
+                    'Tipo': r['tipo'] or "-",
+                    'Estado': "✅" if r['estado'] == 'ok' else "❌",
+                    'Detalle': r['detalle'],
+                } for r in reporte])
+                st.dataframe(tabla_reporte, use_container_width=True, hide_index=True)
+                st.download_button("⬇️ Descargar reporte", tabla_reporte.to_csv(index=False).encode('utf-8'),
+                                   file_name=f"reporte_documentos_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
+                                   mime="text/csv")
+    
     if config['clientes']:
         clientes_lista = [(codigo, cliente['nombre']) for codigo, cliente in config['clientes'].items()]
         cliente_doc = st.selectbox(
@@ -280,36 +572,57 @@ with tab4:
     st.markdown("Comparación anónima de indicadores financieros.")
     
     if len(config['clientes']) >= 2:
-        datos_clientes = []
+        col_info, col_boton = st.columns([3, 1])
+        with col_boton:
+            recalcular = st.button("🔄 Recalcular", key="recalcular_benchmark")
         
-        for codigo, cliente in config['clientes'].items():
-            if not cliente['activo']:
-                continue
-                
-            cliente_dir = DATOS_DIR / codigo
-            if cliente_dir.exists():
-                archivos = list(cliente_dir.glob("*.xlsx"))
-                if archivos:
-                    info = procesar_excel(archivos[0])
-                    if info:
-                        datos_clientes.append({
-                            'nombre_anonimo': f"Cliente {chr(65 + len(datos_clientes))}",
-                            'ventas': info['ventas_total'],
-                            'margen': info['margen_operativo'],
-                            'margen_pct': (info['margen_operativo'] / info['ventas_total'] * 100) if info['ventas_total'] > 0 else 0
-                        })
+        benchmark = cargar_benchmark()
+        if benchmark is None or recalcular:
+            benchmark = actualizar_benchmark(config)
+        
+        # Comparación en valores constantes (ajustada por IPC)
+        ipc = cargar_ipc()
+        mes_base_bench = None
+        if len(ipc):
+            col_toggle, col_base = st.columns([1, 2])
+            with col_toggle:
+                constantes = st.toggle("Valores constantes", key="bench_constantes")
+            if constantes:
+                with col_base:
+                    bases = meses_base(ipc)
+                    mes_base_bench = st.selectbox("Pesos de:", options=bases, index=len(bases)-1,
+                                                  key="bench_mes_base")
+                benchmark = benchmark_constante(tuple(sorted(versiones_clientes(config).items())),
+                                                mes_base_bench, version_ipc())
         
-        if len(datos_clientes) >= 2:
-            df_bench = pd.DataFrame(datos_clientes)
+        with col_info:
+            st.caption(f"Calculado: {benchmark['generado']} • Meses: "
+                       f"{benchmark['meses'][0] if benchmark['meses'] else '-'} a {benchmark['meses'][-1] if benchmark['meses'] else '-'}"
+                       + (f" • Pesos constantes de {mes_base_bench}" if mes_base_bench else ""))
+        
+        if len(benchmark['clientes']) >= 2:
+            filas = []
+            for i, (codigo, datos) in enumerate(benchmark['clientes'].items()):
+                fila = {
+                    'Cliente': f"Cliente {etiqueta_anonima(i)}",
+                    'Sector': datos['sector'],
+                    'Tamaño': datos['tamano'],
+                    'ventas': datos['ventas_anualizadas'],
+                }
+                for metrica, info in datos['metricas'].items():
+                    fila[metrica] = info['valor']
+                    fila[f"pct_{metrica}"] = info['percentil']['todos']
+                filas.append(fila)
+            df_bench = pd.DataFrame(filas)
             
             col1, col2 = st.columns(2)
             
             with col1:
-                st.markdown("#### Ventas Promedio")
+                st.markdown("#### Ventas Anualizadas")
                 import plotly.graph_objects as go
                 fig = go.Figure()
                 fig.add_trace(go.Bar(
-                    x=df_bench['nombre_anonimo'],
+                    x=df_bench['Cliente'],
                     y=df_bench['ventas']/1_000_000,
                     marker_color='lightblue'
                 ))
@@ -323,7 +636,7 @@ with tab4:
                 st.markdown("#### % Margen Operativo")
                 fig = go.Figure()
                 fig.add_trace(go.Bar(
-                    x=df_bench['nombre_anonimo'],
+                    x=df_bench['Cliente'],
                     y=df_bench['margen_pct'],
                     marker_color='lightgreen'
                 ))
@@ -335,25 +648,179 @@ with tab4:
             
             st.divider()
             st.markdown("#### Tabla Comparativa")
-            df_display = df_bench.copy()
-            df_display['ventas'] = df_display['ventas'].apply(lambda x: f"${x/1_000_000:,.1f}M")
-            df_display['margen'] = df_display['margen'].apply(lambda x: f"${x/1_000_000:,.1f}M")
-            df_display['margen_pct'] = df_display['margen_pct'].apply(lambda x: f"{x:.1f}%")
-            df_display.columns = ['Cliente', 'Ventas Totales', 'Margen Operativo', '% Margen']
+            df_display = df_bench[['Cliente', 'Sector', 'Tamaño', 'ventas']].copy()
+            df_display['ventas'] = df_display['ventas'].apply(lambda x: f"${x/1_000_000:,.1f}M" if pd.notna(x) else "N/A")
+            for metrica, titulo in METRICAS.items():
+                df_display[titulo] = [
+                    f"{v:.1f}% (P{p:.0f})" if pd.notna(v) and pd.notna(p) else "N/A"
+                    for v, p in zip(df_bench[metrica], df_bench[f"pct_{metrica}"])
+                ]
+            df_display = df_display.rename(columns={'ventas': 'Ventas Anualizadas'})
             
             st.dataframe(df_display, use_container_width=True, hide_index=True)
+            st.caption("Entre paréntesis: percentil del cliente contra todos los demás.")
+            
+            st.divider()
+            st.markdown("#### Cuartiles por Grupo de Pares")
+            agrupacion = st.radio("Agrupar por:", options=['sector', 'tamano'],
+                                  format_func=lambda x: {'sector': "Sector", 'tamano': "Tamaño"}[x],
+                                  horizontal=True, key="agrupacion_benchmark")
+            filas_grupos = []
+            for grupo, metricas in benchmark['grupos'][agrupacion].items():
+                for metrica, stats in metricas.items():
+                    filas_grupos.append({
+                        'Grupo': grupo,
+                        'Métrica': METRICAS[metrica],
+                        'Clientes': stats['n'],
+                        'Q1': stats['q1'],
+                        'Mediana': stats['mediana'],
+                        'Q3': stats['q3'],
+                    })
+            st.dataframe(pd.DataFrame(filas_grupos), use_container_width=True, hide_index=True)
         else:
             st.warning("Se necesitan al menos 2 clientes con datos para comparar")
     else:
         st.info("Se necesitan al menos 2 clientes registrados para benchmarking")
+    
+    st.divider()
+    with st.expander("📈 Tabla de IPC (ajuste por inflación)"):
+        st.markdown("Índice de precios mensual que usan el dashboard y el benchmarking para mostrar "
+                    "valores constantes. Mes en formato `AAAA-MM`.")
+        if st.button("⬇️ Traer serie oficial (INDEC)", key="ipc_indec",
+                     help="IPC nivel general nacional, base dic. 2016 = 100. Reemplaza la tabla."):
+            try:
+                st.success(f"✅ {actualizar_ipc_indec()} meses de IPC guardados")
+            except Exception as e:
+                st.error(f"No se pudo descargar la serie de INDEC: {e}")
+        ipc_actual = cargar_ipc()
+        tabla_ipc = st.data_editor(
+            pd.DataFrame({'Mes': pd.Series(ipc_actual.index, dtype=str), 'IPC': pd.Series(ipc_actual.values, dtype=float)}),
+            num_rows="dynamic",
+            use_container_width=True,
+            hide_index=True,
+            key="editor_ipc"
+        )
+        if st.button("💾 Guardar IPC", key="guardar_ipc"):
+            guardar_ipc(tabla_ipc)
+            st.success("✅ Tabla de IPC guardada")
 
-# ============== TAB 5: NUEVO CLIENTE ==============
+# ============== TAB 5: PROYECCIONES ==============
 with tab5:
+    st.markdown("### 🔮 Proyecciones por Cliente")
+    st.markdown("Tendencia de los próximos meses para todos los clientes activos, calculada en un solo ajuste.")
+    
+    horizonte_admin = st.slider("Meses a proyectar:", min_value=1, max_value=HORIZONTE_MAX, value=3,
+                                key="horizonte_admin")
+    versiones = versiones_clientes(config)
+    proyecciones = proyectar_clientes(tuple(sorted(versiones.items())), horizonte_admin)
+    
+    if proyecciones:
+        filas = []
+        for codigo, proy in proyecciones.items():
+            fila = {'Cliente': config['clientes'][codigo]['nombre'], 'Hasta': proy['meses'][-1]}
+            for concepto in CONCEPTOS_PROYECCION:
+                # Un concepto sin datos suficientes queda en NaN: se muestra "—"
+                total = sum(proy[concepto]['valor'])
+                fila[concepto] = "—" if pd.isna(total) else f"${total/1_000_000:,.1f}M"
+            fila['Tendencia Ventas'] = f"{proy['Ventas']['pendiente']/1_000_000:+,.1f}M / mes"
+            filas.append(fila)
+        
+        st.markdown(f"#### Totales Proyectados ({horizonte_admin} meses)")
+        st.dataframe(pd.DataFrame(filas), use_container_width=True, hide_index=True)
+        
+        st.divider()
+        codigo_proy = st.selectbox(
+            "Ver detalle de:",
+            options=list(proyecciones),
+            format_func=lambda c: config['clientes'][c]['nombre'],
+            key="detalle_proyeccion"
+        )
+        proy = proyecciones[codigo_proy]
+        import plotly.graph_objects as go
+        fig = go.Figure()
+        colores = {'Ventas': '#0066cc', 'Total Compras': 'orange', 'Margen Operativo': 'green'}
+        for concepto in CONCEPTOS_PROYECCION:
+            fig.add_trace(go.Scatter(
+                x=proy[concepto]['meses'], y=[v/1_000_000 for v in proy[concepto]['valor']],
+                mode='lines+markers',
+                name=concepto,
+                line=dict(color=colores[concepto], width=2, dash='dash'),
+                error_y=dict(
+                    type='data', symmetric=False,
+                    array=[(s - v)/1_000_000 for s, v in zip(proy[concepto]['superior'], proy[concepto]['valor'])],
+                    arrayminus=[(v - i)/1_000_000 for v, i in zip(proy[concepto]['valor'], proy[concepto]['inferior'])]
+                )
+            ))
+        fig.update_layout(yaxis_title="Millones ($)", height=350, hovermode='x unified')
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption("Las barras indican la banda de confianza del 80%.")
+    else:
+        st.info("No hay clientes con datos suficientes para proyectar")
+
+# ============== TAB 6: ALERTAS ==============
+with tab6:
+    st.markdown("### 🚨 Clientes que Requieren Atención")
+    st.markdown("Advertencias de los últimos 3 meses de cada cliente, calculadas en la última carga de datos.")
+    
+    resultado_alertas = cargar_alertas()
+    col_info, col_boton = st.columns([3, 1])
+    with col_boton:
+        if st.button("🔄 Reevaluar", key="reevaluar_alertas") or resultado_alertas is None:
+            resultado_alertas = actualizar_alertas(config)
+    with col_info:
+        st.caption(f"Evaluado: {resultado_alertas['generado']}")
+    
+    atencion = clientes_con_atencion(resultado_alertas)
+    if atencion:
+        for fila in atencion:
+            nombre = config['clientes'].get(fila['codigo'], {}).get('nombre', fila['codigo'])
+            with st.expander(f"🔴 **{nombre}** — {fila['cantidad']} alertas (último mes: {fila['ultimo_mes']})"):
+                for alerta in fila['alertas']:
+                    st.warning(f"**{alerta['titulo']}**  \n{alerta['mensaje']}")
+    else:
+        st.success("✅ Ningún cliente tiene alertas en sus últimos meses")
+    
+    st.divider()
+    st.markdown("#### ⚙️ Umbrales")
+    umbrales = obtener_umbrales(config)
+    with st.form("umbrales_alertas"):
+        col1, col2 = st.columns(2)
+        with col1:
+            sueldos_max = st.number_input("Sueldos / Ventas máximo (%)", min_value=0.0, max_value=100.0,
+                                          value=float(umbrales['sueldos_ventas_max']), step=1.0)
+            caida_pct = st.number_input("Caída de ventas vs. promedio móvil (%)", min_value=0.0, max_value=100.0,
+                                        value=float(umbrales['caida_ventas_pct']), step=1.0)
+            meses_promedio = st.number_input("Meses del promedio móvil", min_value=1, max_value=12,
+                                             value=int(umbrales['meses_promedio_movil']))
+        with col2:
+            meses_negativos = st.number_input("Meses negativos consecutivos", min_value=2, max_value=12,
+                                              value=int(umbrales['meses_negativos_seguidos']))
+            meses_compresion = st.number_input("Meses seguidos de margen en baja", min_value=2, max_value=12,
+                                               value=int(umbrales['meses_compresion_margen']))
+        
+        if st.form_submit_button("💾 Guardar y Reevaluar", type="primary"):
+            config['alertas'] = {
+                'sueldos_ventas_max': sueldos_max,
+                'caida_ventas_pct': caida_pct,
+                'meses_promedio_movil': int(meses_promedio),
+                'meses_negativos_seguidos': int(meses_negativos),
+                'meses_compresion_margen': int(meses_compresion),
+            }
+            guardar_clientes(config)
+            actualizar_alertas(config)
+            st.success("✅ Umbrales guardados")
+            st.rerun()
+
+# ============== TAB 7: NUEVO CLIENTE ==============
+with tab7:
     st.markdown("### ➕ Crear Nuevo Cliente")
     
     with st.form("nuevo_cliente"):
         nombre = st.text_input("Nombre del Cliente:", placeholder="Ej: Supply Petrolero SRL")
         codigo = st.text_input("Código único:", placeholder="Ej: supply_petrolero")
+        sector = st.text_input("Sector (opcional):", placeholder="Ej: Petróleo y Gas")
+        cuit = st.text_input("CUIT (opcional):", placeholder="Ej: 30-71234567-8",
+                             help="Se usa para asignar documentos en la carga masiva")
         
         st.markdown("*El código debe ser único, sin espacios, en minúsculas*")
         
@@ -362,10 +829,12 @@ with tab5:
         if submitted:
             if not nombre or not codigo:
                 st.error("❌ Completá todos los campos")
-            elif codigo in config['clientes']:
+            elif codigo in config['clientes'] or codigo in config.get('grupos', {}):
                 st.error(f"❌ El código '{codigo}' ya existe")
             elif ' ' in codigo or not codigo.islower():
                 st.error("❌ El código debe ser en minúsculas y sin espacios")
+            elif cuit and error_cuit(cuit, config):
+                st.error(error_cuit(cuit, config))
             else:
                 config['clientes'][codigo] = {
                     "nombre": nombre,
@@ -373,6 +842,10 @@ with tab5:
                     "activo": True,
                     "fecha_alta": datetime.now().strftime('%Y-%m-%d')
                 }
+                if sector:
+                    config['clientes'][codigo]['sector'] = sector.strip()
+                if cuit:
+                    config['clientes'][codigo]['cuit'] = cuit.strip()
                 guardar_clientes(config)
                 
                 cliente_dir = DATOS_DIR / codigo
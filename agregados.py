@@ -0,0 +1,174 @@
+"""Series de alta resolución: agregados precalculados y reducción de puntos.
+
+Cuando el Excel de un cliente viene por día o por semana, el dashboard no
+manda miles de puntos por trazo al navegador:
+
+- Los agregados por semana, mes, trimestre y año se calculan una sola vez por
+  versión de datos (con un ``groupby`` por período) y quedan en la caché en
+  disco; cambiar de vista no recalcula nada.
+- Las vistas finas (diaria, semanal) se reducen en el servidor a un punto
+  por píxel del ancho del gráfico con LTTB (Largest-Triangle-Three-Buckets),
+  que conserva la forma de la serie, o con mínimo/máximo por tramo, que
+  conserva los picos. Streamlit no informa al servidor el ancho real de la
+  ventana: se parte del ancho del área principal en el layout "wide" y de la
+  fracción que ocupa la columna del gráfico.
+"""
+import numpy as np
+import pandas as pd
+
+from cache_disco import hash_contenido, obtener_o_calcular
+from inflacion import deflactar
+from procesamiento import CONCEPTOS, agregar_derivados, convertir_fecha_español, granularidad, leer_excel_detalle
+
+NIVELES = ['diaria', 'semanal', 'mensual', 'trimestral', 'anual']
+
+FRECUENCIAS = {'diaria': 'D', 'semanal': 'W', 'mensual': 'M', 'trimestral': 'Q', 'anual': 'Y'}
+
+# Ancho típico (en píxeles) del área principal en el layout "wide"
+ANCHO_AREA = 1400
+
+METODOS_REDUCCION = {'lttb': "Forma de la curva (LTTB)", 'minmax': "Picos (mínimo y máximo)"}
+
+# Cambiar si cambia el cálculo: invalida los agregados guardados en la caché en disco
+FORMATO_AGREGADOS = 1
+
+
+def puntos_por_trazo(fraccion_ancho=1.0):
+    """Puntos por trazo para un gráfico que ocupa ``fraccion_ancho`` del área principal"""
+    return max(int(ANCHO_AREA * fraccion_ancho), 3)
+
+
+def niveles_disponibles(granularidad_original):
+    """Vistas posibles: la granularidad del Excel y las más gruesas"""
+    return NIVELES[NIVELES.index(granularidad_original):]
+
+
+def _etiquetas(nivel, periodos):
+    if nivel == 'diaria':
+        return periodos.strftime('%d/%m/%Y')
+    if nivel == 'semanal':
+        return periodos.start_time.strftime('Sem. %d/%m/%Y')
+    if nivel == 'mensual':
+        return [convertir_fecha_español(m) for m in periodos.strftime('%Y-%m')]
+    if nivel == 'trimestral':
+        return [f"{p.quarter}T {p.year}" for p in periodos]
+    return periodos.strftime('%Y')
+
+
+def calcular_agregados(detalle, granularidad_original):
+    """{nivel: DataFrame} con los conceptos sumados por período y los derivados recalculados.
+
+    Cada DataFrame tiene Periodo (etiqueta), Inicio (fecha), Clave Desde y
+    Clave Hasta (clave del primer y último mes del período, año * 12 + mes - 1,
+    para filtrar por el período del dashboard) y Registros (fechas sumadas).
+    """
+    agregados = {}
+    for nivel in niveles_disponibles(granularidad_original):
+        periodos = detalle['Fecha'].dt.to_period(FRECUENCIAS[nivel])
+        grupos = detalle.groupby(periodos)
+        tabla = grupos[CONCEPTOS].sum(min_count=1)
+        indice = pd.PeriodIndex(tabla.index)
+        inicio = indice.start_time
+        fin = indice.end_time
+
+        df = pd.DataFrame({
+            'Periodo': _etiquetas(nivel, indice),
+            'Inicio': inicio,
+            'Clave Desde': (inicio.year * 12 + inicio.month - 1).to_numpy(),
+            'Clave Hasta': (fin.year * 12 + fin.month - 1).to_numpy(),
+            'Registros': grupos.size().to_numpy(),
+        })
+        for concepto in CONCEPTOS:
+            df[concepto] = tabla[concepto].to_numpy()
+        agregados[nivel] = agregar_derivados(df)
+    return agregados
+
+
+def agregados_cliente(archivo, version=None, mes_base=None, version_ipc=None):
+    """(granularidad, {nivel: DataFrame}) del Excel del cliente, guardado en la caché en disco.
+
+    Con ``mes_base`` se deflacta el detalle por el IPC de su mes antes de agregar.
+    """
+    def calcular():
+        detalle = leer_excel_detalle(archivo)
+        original = granularidad(detalle)
+        if mes_base:
+            detalle = detalle.assign(Mes=detalle['Fecha'].dt.strftime('%Y-%m'))
+            detalle = deflactar(detalle, mes_base)
+        return original, calcular_agregados(detalle, original)
+
+    clave = (hash_contenido(archivo, version), FORMATO_AGREGADOS, mes_base, version_ipc)
+    return obtener_o_calcular('agregados', clave, calcular)
+
+
+def filtrar_periodo(agregado, clave_desde, clave_hasta):
+    """Períodos que se superponen con los meses [clave_desde, clave_hasta] (vista, sin copiar)"""
+    visibles = (agregado['Clave Hasta'].to_numpy() >= clave_desde) & (agregado['Clave Desde'].to_numpy() <= clave_hasta)
+    return agregado[visibles]
+
+
+def _como_numeros(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(float)
+    return x.astype(float)
+
+
+def reducir_lttb(x, y, puntos):
+    """Índices de los ``puntos`` que elige LTTB (los NaN se descartan).
+
+    Se conservan el primero y el último; de cada tramo intermedio, el punto
+    que forma el triángulo más grande con el elegido antes y el promedio del
+    tramo siguiente. El cálculo dentro de cada tramo es vectorizado.
+    """
+    x = _como_numeros(x)
+    y = np.asarray(y, dtype=float)
+    validos = np.flatnonzero(~np.isnan(y))
+    n = len(validos)
+    if puntos >= n or puntos < 3:
+        return validos
+    xv, yv = x[validos], y[validos]
+
+    # Tramos para los n - 2 puntos intermedios
+    bordes = np.linspace(1, n - 1, puntos - 1).astype(int)
+    promedio_x = np.add.reduceat(xv[1:-1], bordes[:-1] - 1) / np.diff(bordes)
+    promedio_y = np.add.reduceat(yv[1:-1], bordes[:-1] - 1) / np.diff(bordes)
+
+    elegidos = np.empty(puntos, dtype=int)
+    elegidos[0], elegidos[-1] = 0, n - 1
+    a = 0
+    for i in range(puntos - 2):
+        desde, hasta = bordes[i], bordes[i + 1]
+        if i + 1 < puntos - 2:
+            cx, cy = promedio_x[i + 1], promedio_y[i + 1]
+        else:
+            cx, cy = xv[-1], yv[-1]
+        areas = np.abs((xv[a] - cx) * (yv[desde:hasta] - yv[a]) - (xv[a] - xv[desde:hasta]) * (cy - yv[a]))
+        a = desde + int(np.argmax(areas))
+        elegidos[i + 1] = a
+    return validos[elegidos]
+
+
+def reducir_minmax(y, puntos):
+    """Índices del mínimo y el máximo de cada tramo (``puntos`` / 2 tramos), en orden"""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    tramos = max(puntos // 2, 1)
+    if n <= puntos:
+        return np.flatnonzero(~np.isnan(y))
+    largo = -(-n // tramos)
+    relleno = np.full(tramos * largo - n, np.nan)
+    bloques = np.concatenate([y, relleno]).reshape(tramos, largo)
+    hay = ~np.all(np.isnan(bloques), axis=1)
+    base = np.arange(tramos) * largo
+    minimos = base + np.argmin(np.where(np.isnan(bloques), np.inf, bloques), axis=1)
+    maximos = base + np.argmax(np.where(np.isnan(bloques), -np.inf, bloques), axis=1)
+    return np.unique(np.concatenate([minimos[hay], maximos[hay]]))
+
+
+def reducir(x, y, puntos, metodo='lttb'):
+    """(x, y) con a lo sumo ``puntos`` puntos, listos para un trazo de Plotly"""
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    idx = reducir_lttb(x, y, puntos) if metodo == 'lttb' else reducir_minmax(y, puntos)
+    return x[idx], y[idx]
@@ -0,0 +1,295 @@
+"""Motor de alertas: reglas evaluadas en bloque sobre la matriz clientes × meses.
+
+Las reglas se evalúan para todos los clientes a la vez después de cada carga
+de datos y el resultado se guarda en ``datos/_alertas.json``. El dashboard de
+cada cliente lee sus alertas de ahí y el panel admin arma la vista de
+"clientes que requieren atención" sin recalcular nada.
+"""
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from analitica import cargar_frames, construir_matriz, versiones_clientes
+from procesamiento import DATOS_DIR, convertir_fecha_español, formatear_monto, formatear_porcentaje
+
+ALERTAS_FILE = DATOS_DIR / "_alertas.json"
+
+# Umbrales por defecto; se pueden sobreescribir en clientes.json ("alertas")
+UMBRALES = {
+    'sueldos_ventas_max': 20.0,     # % de sueldos sobre ventas que dispara la alerta
+    'caida_ventas_pct': 20.0,       # caída (%) de ventas contra el promedio móvil
+    'meses_promedio_movil': 3,      # meses previos del promedio móvil de ventas
+    'meses_negativos_seguidos': 3,  # racha de meses con margen operativo negativo
+    'meses_compresion_margen': 3,   # racha de meses con % margen operativo en baja
+}
+
+REGLAS = {
+    'margen_negativo': "⚠️ Margen Operativo Negativo",
+    'recuperacion': "✅ Recuperación de Margen",
+    'sueldos_ventas': "🧑‍💼 Sueldos Elevados",
+    'caida_ventas': "📉 Caída de Ventas",
+    'racha_negativa': "🔴 Meses Negativos Consecutivos",
+    'compresion_margen': "📊 Compresión de Margen",
+}
+
+
+def obtener_umbrales(config):
+    umbrales = dict(UMBRALES)
+    umbrales.update(config.get('alertas', {}))
+    return umbrales
+
+
+def _dividir(a, b):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(b != 0, a / b, np.nan)
+
+
+def _rachas(condicion):
+    """Largo de la racha vigente en cada (cliente, mes) donde se cumple ``condicion``"""
+    idx = np.arange(condicion.shape[1])
+    ultimo_corte = np.maximum.accumulate(np.where(~condicion, idx, -1), axis=1)
+    return np.where(condicion, idx - ultimo_corte, 0)
+
+
+def _fin_de_racha(condicion):
+    """True en el último mes de cada racha (incluida la que sigue abierta)"""
+    siguiente = np.zeros_like(condicion)
+    siguiente[:, :-1] = condicion[:, 1:]
+    return condicion & ~siguiente
+
+
+def _promedio_previo(valores, n):
+    """Promedio de los n meses anteriores a cada mes; NaN si falta alguno"""
+    validos = ~np.isnan(valores)
+    acumulado = np.concatenate([np.zeros((valores.shape[0], 1)), np.cumsum(np.where(validos, valores, 0), axis=1)], axis=1)
+    cantidad = np.concatenate([np.zeros((valores.shape[0], 1)), np.cumsum(validos, axis=1)], axis=1)
+    hasta = np.arange(valores.shape[1])
+    desde = hasta - n
+    ok = desde >= 0
+    desde = np.maximum(desde, 0)
+    suma = acumulado[:, hasta] - acumulado[:, desde]
+    completos = (cantidad[:, hasta] - cantidad[:, desde]) == n
+    return np.where(completos & ok[None, :], suma / n, np.nan)
+
+
+def evaluar_reglas(matriz, umbrales):
+    """Evalúa todas las reglas sobre la matriz; devuelve {regla: array bool (cliente, mes)}
+
+    También devuelve los valores que se usan en los mensajes.
+    """
+    ventas = matriz['Ventas']
+    margen = matriz['Margen Operativo']
+    sueldos_ventas = _dividir(matriz['Sueldos y CS'], ventas) * 100
+    margen_pct = _dividir(margen, ventas) * 100
+
+    negativo = margen < 0
+
+    # Recuperación: solo en el último mes informado de cada cliente, con algún mes negativo antes
+    informado = ~np.isnan(margen)
+    ultimo = np.zeros_like(negativo)
+    if margen.size:
+        ultimo[np.arange(len(margen)), margen.shape[1] - 1 - np.argmax(informado[:, ::-1], axis=1)] = True
+    ultimo &= informado
+    negativo_antes = (np.cumsum(negativo, axis=1) - negativo) > 0
+
+    promedio_movil = _promedio_previo(ventas, int(umbrales['meses_promedio_movil']))
+    caida = (1 - _dividir(ventas, promedio_movil)) * 100
+
+    racha_negativa = _rachas(negativo)
+
+    en_baja = np.zeros_like(negativo)
+    en_baja[:, 1:] = np.diff(margen_pct, axis=1) < 0
+    racha_baja = _rachas(en_baja)
+
+    with np.errstate(invalid='ignore'):
+        reglas = {
+            'margen_negativo': negativo,
+            'recuperacion': ultimo & (margen > 0) & negativo_antes,
+            'sueldos_ventas': sueldos_ventas > umbrales['sueldos_ventas_max'],
+            'caida_ventas': caida > umbrales['caida_ventas_pct'],
+            'racha_negativa': _fin_de_racha(negativo) & (racha_negativa >= umbrales['meses_negativos_seguidos']),
+            'compresion_margen': _fin_de_racha(en_baja) & (racha_baja >= umbrales['meses_compresion_margen']),
+        }
+    valores = {
+        'margen': margen,
+        'sueldos_ventas': sueldos_ventas,
+        'caida': caida,
+        'racha_negativa': racha_negativa,
+        'racha_baja': racha_baja,
+        'margen_pct': margen_pct,
+    }
+    return reglas, valores
+
+
+def _mensaje(regla, mes, v, i, j, umbrales):
+    mes_es = convertir_fecha_español(mes)
+    if regla == 'margen_negativo':
+        return f"El mes {mes_es} tuvo margen operativo negativo: {formatear_monto(v['margen'][i, j])}"
+    if regla == 'recuperacion':
+        return f"El último mes ({mes_es}) volvió a margen operativo positivo: {formatear_monto(v['margen'][i, j])}"
+    if regla == 'sueldos_ventas':
+        return (f"En {mes_es} los sueldos representaron {formatear_porcentaje(v['sueldos_ventas'][i, j])} "
+                f"de las ventas (límite: {umbrales['sueldos_ventas_max']:.0f}%)")
+    if regla == 'caida_ventas':
+        return (f"Las ventas de {mes_es} quedaron {formatear_porcentaje(v['caida'][i, j])} por debajo del "
+                f"promedio de los {int(umbrales['meses_promedio_movil'])} meses anteriores")
+    if regla == 'racha_negativa':
+        return f"{int(v['racha_negativa'][i, j])} meses seguidos con margen operativo negativo hasta {mes_es}"
+    return (f"El % de margen operativo bajó {int(v['racha_baja'][i, j])} meses seguidos hasta {mes_es} "
+            f"({formatear_porcentaje(v['margen_pct'][i, j])})")
+
+
+def calcular_alertas(config, frames=None):
+    """Evalúa las reglas para todos los clientes y arma el resultado a guardar"""
+    if frames is None:
+        frames = cargar_frames(config)
+    umbrales = obtener_umbrales(config)
+    matriz = construir_matriz(frames)
+    reglas, valores = evaluar_reglas(matriz, umbrales)
+
+    alertas = {codigo: [] for codigo in matriz.codigos}
+    for regla, marcas in reglas.items():
+        tipo = 'success' if regla == 'recuperacion' else 'warning'
+        for i, j in zip(*np.nonzero(marcas)):
+            mes = matriz.meses[j]
+            alertas[matriz.codigos[i]].append({
+                'regla': regla,
+                'tipo': tipo,
+                'titulo': REGLAS[regla],
+                'mensaje': _mensaje(regla, mes, valores, i, j, umbrales),
+                'mes': mes,
+            })
+    for lista in alertas.values():
+        lista.sort(key=lambda a: (a['mes'], a['regla']))
+
+    return {
+        'generado': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'umbrales': umbrales,
+        'ultimo_mes': {codigo: df['Mes'].iloc[-1] for codigo, df in frames.items() if len(df)},
+        'clientes': alertas,
+    }
+
+
+def guardar_alertas(resultado):
+    DATOS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = ALERTAS_FILE.with_suffix('.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, ALERTAS_FILE)
+
+
+def actualizar_alertas(config, frames=None):
+    """Reevalúa y guarda las alertas; se llama después de cada carga de datos"""
+    if frames is None:
+        frames = cargar_frames(config)
+    resultado = calcular_alertas(config, frames)
+    resultado['versiones'] = versiones_clientes(config)
+    guardar_alertas(resultado)
+    return resultado
+
+
+def _inicio_evaluacion(df, corte, umbrales):
+    """Primera fila de ``df`` que hace falta para reevaluar las reglas desde el mes ``corte``.
+
+    El promedio móvil mira ``meses_promedio_movil`` meses atrás; las rachas
+    vigentes en ``corte`` se toman desde su comienzo (la compresión, desde el
+    mes anterior, contra el que se compara), y si el último mes es positivo,
+    desde el último mes negativo (regla de recuperación).
+    """
+    c = int(np.searchsorted(df['Mes'].to_numpy(dtype=str), corte))
+    if c >= len(df):
+        return max(len(df) - 1, 0)
+    margen = df['Margen Operativo'].to_numpy(dtype=float)
+    negativo = margen < 0
+    en_baja = np.zeros_like(negativo)
+    en_baja[1:] = np.diff(_dividir(margen, df['Ventas'].to_numpy(dtype=float))) < 0
+
+    inicio = c - max(int(umbrales['meses_promedio_movil']), 1)
+    for condicion, previo in ((negativo, 0), (en_baja, 1)):
+        k = c
+        while k > 0 and condicion[k] and condicion[k - 1]:
+            k -= 1
+        inicio = min(inicio, k - previo)
+    if margen[-1] > 0 and not negativo[max(inicio, 0):-1].any():
+        anteriores = np.flatnonzero(negativo[:max(inicio, 0)])
+        if len(anteriores):
+            inicio = anteriores[-1]
+    return max(int(inicio), 0)
+
+
+def actualizar_alertas_cliente(config, codigo_cliente, df, version, desde):
+    """Actualiza solo las alertas de un cliente desde el mes ``desde`` (YYYY-MM).
+
+    Se reemplazan las alertas a partir del mes anterior a ``desde``, que
+    puede dejar de ser el fin de una racha, y las reglas se evalúan solo
+    sobre ese tramo más los meses previos que necesitan (ver
+    ``_inicio_evaluacion``). Las de los meses anteriores y las de los demás
+    clientes quedan como estaban. Sin resultado guardado o con otros
+    umbrales, se recalcula todo.
+    """
+    resultado = cargar_alertas()
+    umbrales = obtener_umbrales(config)
+    if resultado is None or resultado.get('umbrales') != umbrales:
+        return actualizar_alertas(config)
+
+    previas = resultado['clientes'].get(codigo_cliente, [])
+    if desde is not None:
+        corte = str(pd.Period(desde, freq='M') - 1)
+        tramo = df.iloc[_inicio_evaluacion(df, corte, umbrales):]
+        nuevas = [a for a in alertas_cliente(tramo, config) if a['mes'] >= corte]
+        previas = sorted([a for a in previas if a['mes'] < corte] + nuevas, key=lambda a: (a['mes'], a['regla']))
+
+    resultado['clientes'][codigo_cliente] = previas
+    if len(df):
+        resultado['ultimo_mes'][codigo_cliente] = df['Mes'].iloc[-1]
+    resultado.setdefault('versiones', {})[codigo_cliente] = version
+    resultado['generado'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    guardar_alertas(resultado)
+    return resultado
+
+
+def cargar_alertas():
+    if ALERTAS_FILE.exists():
+        with open(ALERTAS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return None
+
+
+def alertas_vigentes(codigo_cliente, version):
+    """Alertas guardadas del cliente, o None si se calcularon con otra versión de datos"""
+    resultado = cargar_alertas()
+    if resultado and resultado.get('versiones', {}).get(codigo_cliente) == version:
+        return resultado['clientes'].get(codigo_cliente, [])
+    return None
+
+
+def alertas_cliente(df, config):
+    """Evalúa las reglas para un solo cliente (cuando no hay resultado guardado vigente)"""
+    return calcular_alertas(config, {'cliente': df})['clientes']['cliente']
+
+
+def clientes_con_atencion(resultado, meses_recientes=3):
+    """Resumen por cliente de las advertencias en sus últimos meses, ordenado por cantidad"""
+    filas = []
+    for codigo, lista in resultado['clientes'].items():
+        ultimo = resultado['ultimo_mes'].get(codigo)
+        if ultimo is None:
+            continue
+        anio, mes = int(ultimo[:4]), int(ultimo[5:7])
+        indice = anio * 12 + mes - 1
+        recientes = [
+            a for a in lista
+            if a['tipo'] == 'warning' and indice - (int(a['mes'][:4]) * 12 + int(a['mes'][5:7]) - 1) < meses_recientes
+        ]
+        if recientes:
+            filas.append({
+                'codigo': codigo,
+                'ultimo_mes': ultimo,
+                'cantidad': len(recientes),
+                'reglas': sorted({a['regla'] for a in recientes}),
+                'alertas': recientes,
+            })
+    return sorted(filas, key=lambda f: -f['cantidad'])
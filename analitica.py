@@ -0,0 +1,408 @@
+"""Analítica entre clientes: matriz clientes × meses y comparación contra pares.
+
+Todo se calcula sobre arrays de NumPy con forma (cliente, mes), sin recorrer
+clientes uno por uno. El resultado se guarda en ``datos/_benchmark.json`` para
+que el dashboard de cada cliente lea su posición sin abrir datos ajenos; los
+valores mensuales de la ventana, que solo usa el panel admin para las
+actualizaciones incrementales, van aparte en ``datos/_benchmark_ventana.json``.
+"""
+import json
+import os
+import warnings
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+from procesamiento import CONCEPTOS, DATOS_DIR, leer_excel_cacheado, obtener_archivo_cliente, version_datos
+
+BENCHMARK_FILE = DATOS_DIR / "_benchmark.json"
+VENTANA_FILE = DATOS_DIR / "_benchmark_ventana.json"
+
+# Meses (del eje común) que se usan para comparar
+MESES_VENTANA = 12
+
+# Mínimo de clientes en un grupo para mostrar sus cuartiles (anonimato)
+MIN_PARES = 3
+
+# Meses informados necesarios en cada mitad de la ventana para calcular el crecimiento
+MIN_MESES_CRECIMIENTO = 3
+
+# Ventas anualizadas (en $) que separan los tamaños de empresa
+LIMITES_TAMANO = [(500_000_000, "Pequeña"), (3_000_000_000, "Mediana"), (float('inf'), "Grande")]
+
+METRICAS = {
+    'margen_pct': "% Margen Operativo",
+    'sueldos_ventas': "Sueldos / Ventas",
+    'crecimiento': "Crecimiento de Ventas",
+}
+
+
+class MatrizClientes:
+    """Valores de cada concepto en una matriz (concepto, cliente, mes)"""
+
+    def __init__(self, codigos, meses, valores):
+        self.codigos = list(codigos)
+        self.meses = list(meses)
+        self.valores = valores
+        self._idx = {c: i for i, c in enumerate(CONCEPTOS)}
+
+    def __getitem__(self, concepto):
+        return self.valores[self._idx[concepto]]
+
+    def ultimos(self, n):
+        """Recorta la matriz a los últimos n meses del eje común"""
+        return MatrizClientes(self.codigos, self.meses[-n:], self.valores[:, :, -n:])
+
+
+def construir_matriz(frames, meses=None):
+    """Arma la matriz a partir de {codigo: DataFrame de leer_excel}.
+
+    Los meses que un cliente no informa quedan como NaN. Con ``meses`` se usa
+    ese eje (y se ignoran los meses de fuera) en lugar de la unión de todos.
+    """
+    codigos = list(frames)
+    if meses is None:
+        meses = sorted(set().union(*(df['Mes'] for df in frames.values()))) if frames else []
+    pos_mes = {m: j for j, m in enumerate(meses)}
+
+    valores = np.full((len(CONCEPTOS), len(codigos), len(meses)), np.nan)
+    for i, codigo in enumerate(codigos):
+        df = frames[codigo]
+        df = df[df['Mes'].isin(pos_mes)]
+        cols = df['Mes'].map(pos_mes).to_numpy(dtype=int)
+        valores[:, i, cols] = df[CONCEPTOS].to_numpy(dtype=float).T
+
+    return MatrizClientes(codigos, meses, valores)
+
+
+def cargar_frames(config, solo_activos=True):
+    """Lee el Excel vigente de cada cliente que tenga datos (los DataFrames son compartidos)"""
+    frames = {}
+    for codigo, cliente in config['clientes'].items():
+        if solo_activos and not cliente['activo']:
+            continue
+        archivo = obtener_archivo_cliente(codigo)
+        if archivo is None:
+            continue
+        try:
+            frames[codigo] = leer_excel_cacheado(archivo)
+        except Exception:
+            continue
+    return frames
+
+
+def versiones_clientes(config, solo_activos=True):
+    """Versión de datos vigente de cada cliente con datos: {codigo: version}.
+
+    Sirve como clave de caché para los cálculos que abarcan a todos los clientes.
+    """
+    versiones = {}
+    for codigo, cliente in config['clientes'].items():
+        if solo_activos and not cliente['activo']:
+            continue
+        archivo = obtener_archivo_cliente(codigo)
+        if archivo is not None:
+            versiones[codigo] = version_datos(archivo)
+    return versiones
+
+
+def _dividir(a, b):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(b != 0, a / b, np.nan)
+
+
+def _promedio_informado(valores, minimo=1):
+    """Promedio por fila de los meses con dato; NaN si la fila tiene menos de ``minimo``"""
+    informados = np.sum(~np.isnan(valores), axis=1)
+    return np.where(informados >= minimo, _dividir(np.nansum(valores, axis=1), informados), np.nan)
+
+
+def calcular_metricas(matriz):
+    """Métricas por cliente sobre la ventana: devuelve {metrica: array(n_clientes)}"""
+    ventas = matriz['Ventas']
+    ventas_total = np.nansum(ventas, axis=1)
+
+    # Crecimiento: venta mensual promedio de la segunda mitad de la ventana contra la
+    # primera, solo sobre los meses que el cliente informó (un mes sin datos no es venta cero)
+    n_meses = len(matriz.meses)
+    mitad = n_meses // 2
+    recientes = _promedio_informado(ventas[:, n_meses - mitad:], MIN_MESES_CRECIMIENTO)
+    previas = _promedio_informado(ventas[:, n_meses - 2 * mitad:n_meses - mitad], MIN_MESES_CRECIMIENTO)
+
+    return {
+        'margen_pct': _dividir(np.nansum(matriz['Margen Operativo'], axis=1), ventas_total) * 100,
+        'sueldos_ventas': _dividir(np.nansum(matriz['Sueldos y CS'], axis=1), ventas_total) * 100,
+        'crecimiento': (_dividir(recientes, previas) - 1) * 100,
+    }
+
+
+def ventas_anualizadas(matriz):
+    """Promedio mensual de ventas en la ventana llevado a 12 meses"""
+    return _promedio_informado(matriz['Ventas']) * 12
+
+
+def asignar_tamano(anualizadas):
+    """Clasifica cada cliente según sus ventas anualizadas"""
+    limites = np.array([limite for limite, _ in LIMITES_TAMANO])
+    nombres = np.array([nombre for _, nombre in LIMITES_TAMANO])
+    idx = np.searchsorted(limites, np.nan_to_num(anualizadas, nan=0.0), side='right')
+    return nombres[np.minimum(idx, len(nombres) - 1)]
+
+
+def estadisticas_por_grupo(valores, grupos):
+    """Cuartiles, mediana y percentil de cada cliente dentro de su grupo.
+
+    ``valores`` y ``grupos`` tienen largo n_clientes. Devuelve
+    (resumen por grupo, percentil de cada cliente).
+    """
+    if not len(valores):
+        return {}, np.array([])
+    nombres, ids = np.unique(grupos, return_inverse=True)
+    validos = ~np.isnan(valores)
+
+    # Matriz (grupo, cliente) con NaN fuera del grupo, para cuantiles en bloque
+    pertenece = ids[None, :] == np.arange(len(nombres))[:, None]
+    por_grupo = np.where(pertenece, valores[None, :], np.nan)
+    n_validos = np.sum(pertenece & validos[None, :], axis=1)
+    with warnings.catch_warnings():
+        # Los grupos sin valores quedan en NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        q1, mediana, q3 = np.nanpercentile(por_grupo, [25, 50, 75], axis=1)
+
+    # Percentil: % de pares del mismo grupo con valor menor o igual
+    mismo_grupo = (ids[:, None] == ids[None, :]) & validos[None, :]
+    menores = mismo_grupo & (valores[None, :] <= valores[:, None])
+    percentil = np.where(validos, _dividir(menores.sum(axis=1), mismo_grupo.sum(axis=1)) * 100, np.nan)
+
+    resumen = {
+        str(nombre): {
+            'n': int(n_validos[g]),
+            'q1': _a_float(q1[g]),
+            'mediana': _a_float(mediana[g]),
+            'q3': _a_float(q3[g]),
+        }
+        for g, nombre in enumerate(nombres)
+    }
+    return resumen, percentil
+
+
+def _a_float(valor):
+    return None if valor is None or np.isnan(valor) else round(float(valor), 2)
+
+
+def _sin_redondear(valores):
+    return [None if np.isnan(v) else float(v) for v in valores]
+
+
+def _de_guardado(filas):
+    return np.array([[np.nan if v is None else v for v in fila] for fila in filas], dtype=float)
+
+
+def calcular_benchmark(config, frames=None):
+    """Calcula métricas, grupos de pares y percentiles para todos los clientes"""
+    return _armar_benchmark(config, _matriz_ventana(config, frames))
+
+
+def _matriz_ventana(config, frames=None):
+    if frames is None:
+        frames = cargar_frames(config)
+    return construir_matriz(frames).ultimos(MESES_VENTANA)
+
+
+def _armar_benchmark(config, matriz):
+    """Grupos de pares, cuartiles y percentiles a partir de la matriz de la ventana"""
+    codigos, meses = matriz.codigos, matriz.meses
+    metricas = calcular_metricas(matriz)
+    anualizadas = ventas_anualizadas(matriz)
+    sectores = np.array([config['clientes'][c].get('sector') or "Sin sector" for c in codigos])
+    tamanos = asignar_tamano(anualizadas)
+    todos = np.array(["Todos"] * len(codigos))
+
+    agrupaciones = {'sector': sectores, 'tamano': tamanos, 'todos': todos}
+    grupos = {}
+    percentiles = {}
+    for agrupacion, etiquetas in agrupaciones.items():
+        grupos[agrupacion] = {}
+        for metrica, valores in metricas.items():
+            resumen, percentil = estadisticas_por_grupo(valores, etiquetas)
+            for nombre, stats in resumen.items():
+                grupos[agrupacion].setdefault(nombre, {})[metrica] = stats
+            percentiles[(agrupacion, metrica)] = percentil
+
+    clientes = {}
+    for i, codigo in enumerate(codigos):
+        clientes[codigo] = {
+            'sector': str(sectores[i]),
+            'tamano': str(tamanos[i]),
+            'ventas_anualizadas': _a_float(anualizadas[i]),
+            'metricas': {
+                metrica: {
+                    'valor': _a_float(valores[i]),
+                    'percentil': {a: _a_float(percentiles[(a, metrica)][i]) for a in agrupaciones},
+                }
+                for metrica, valores in metricas.items()
+            },
+        }
+
+    return {
+        'generado': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'meses': meses,
+        'grupos': grupos,
+        'clientes': clientes,
+    }
+
+
+def _guardar_json(ruta, contenido, indent=None):
+    DATOS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = ruta.with_suffix('.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(contenido, f, indent=indent, ensure_ascii=False)
+    os.replace(tmp, ruta)
+
+
+def guardar_benchmark(resultado, matriz=None):
+    """Guarda el benchmark y, con ``matriz``, la ventana para las actualizaciones incrementales.
+
+    La ventana (concepto → cliente → mes, sin redondear) queda en un archivo
+    aparte que solo lee el panel admin; lleva el 'generado' del benchmark para
+    detectar que ambos corresponden al mismo cálculo.
+    """
+    if matriz is not None:
+        _guardar_json(VENTANA_FILE, {
+            'generado': resultado['generado'],
+            'codigos': matriz.codigos,
+            'meses': matriz.meses,
+            'valores': {concepto: [_sin_redondear(fila) for fila in matriz[concepto]] for concepto in CONCEPTOS},
+        })
+    _guardar_json(BENCHMARK_FILE, resultado, indent=2)
+
+
+def actualizar_benchmark(config, frames=None):
+    """Recalcula y guarda el benchmark; se llama después de cada carga de datos"""
+    matriz = _matriz_ventana(config, frames)
+    resultado = _armar_benchmark(config, matriz)
+    guardar_benchmark(resultado, matriz)
+    return resultado
+
+
+def _cargar_ventana(previo):
+    """Ventana guardada como MatrizClientes, o None si falta o no es la del benchmark ``previo``"""
+    if not VENTANA_FILE.exists():
+        return None
+    with open(VENTANA_FILE, 'r', encoding='utf-8') as f:
+        ventana = json.load(f)
+    if (ventana['generado'] != previo['generado'] or ventana['meses'] != previo['meses']
+            or ventana['codigos'] != list(previo['clientes'])):
+        return None
+    forma = (len(ventana['codigos']), len(ventana['meses']))
+    valores = np.stack([_de_guardado(ventana['valores'][concepto]).reshape(forma) for concepto in CONCEPTOS])
+    return MatrizClientes(ventana['codigos'], ventana['meses'], valores)
+
+
+def actualizar_benchmark_cliente(config, codigo_cliente, df, meses_afectados):
+    """Actualiza el benchmark después de una carga que solo cambió ``meses_afectados`` de un cliente.
+
+    La ventana de todos los clientes está guardada junto al benchmark, así que
+    no se vuelve a leer ningún Excel: se reemplaza la fila del cliente y, si la
+    carga agrega meses al final (el caso típico del cierre de mes), el eje se
+    corre: salen las columnas más viejas y entran las nuevas, vacías para los
+    demás clientes (ninguno las tiene, si no ya estarían en el eje). Después
+    se recalculan las métricas, cuartiles y percentiles en bloque.
+
+    Si ningún mes afectado cae en la ventana y el eje no cambia, el benchmark
+    no se toca. Se recalcula todo desde los Excel cuando cambia el conjunto de
+    clientes o cuando la carga borra meses de la ventana (el eje podría
+    retroceder a meses que solo tienen otros clientes).
+    """
+    previo = cargar_benchmark()
+    if (previo is None or set(previo['clientes']) != set(versiones_clientes(config))
+            or codigo_cliente not in previo['clientes'] or not previo['meses'] or not len(df)):
+        return actualizar_benchmark(config)
+    guardada = _cargar_ventana(previo)
+    if guardada is None:
+        return actualizar_benchmark(config)
+
+    meses = previo['meses']
+    if (set(meses_afectados) - set(df['Mes'])) & set(meses):
+        return actualizar_benchmark(config)
+
+    # Meses del cliente que entran al eje: con la ventana llena, solo los posteriores a su comienzo
+    entrantes = set(df['Mes']) if len(meses) < MESES_VENTANA else {m for m in df['Mes'] if m > meses[0]}
+    eje = sorted(set(meses) | entrantes)[-MESES_VENTANA:]
+    if eje == meses and not set(meses_afectados) & set(meses):
+        return previo
+
+    codigos = guardada.codigos
+    pos_previa = {m: j for j, m in enumerate(meses)}
+    quedan = [j for j, m in enumerate(eje) if m in pos_previa]
+
+    valores = np.full((len(CONCEPTOS), len(codigos), len(eje)), np.nan)
+    valores[:, :, quedan] = guardada.valores[:, :, [pos_previa[eje[j]] for j in quedan]]
+    valores[:, codigos.index(codigo_cliente), :] = construir_matriz({codigo_cliente: df}, eje).valores[:, 0, :]
+
+    matriz = MatrizClientes(codigos, eje, valores)
+    resultado = _armar_benchmark(config, matriz)
+    guardar_benchmark(resultado, matriz)
+    return resultado
+
+
+def reagrupar_benchmark(config):
+    """Rearma grupos de pares y percentiles con la ventana guardada, sin leer ningún Excel.
+
+    Se usa cuando cambia el sector de un cliente; si la ventana no está o no
+    corresponde a los clientes actuales, se recalcula todo.
+    """
+    previo = cargar_benchmark()
+    guardada = _cargar_ventana(previo) if previo is not None else None
+    if guardada is None or set(guardada.codigos) != set(versiones_clientes(config)):
+        return actualizar_benchmark(config)
+    resultado = _armar_benchmark(config, guardada)
+    guardar_benchmark(resultado, guardada)
+    return resultado
+
+
+def cargar_benchmark():
+    """Benchmark guardado (o None); se relee solo cuando cambia el archivo. No modificar, es compartido"""
+    try:
+        estado = BENCHMARK_FILE.stat()
+    except FileNotFoundError:
+        return None
+    return _leer_benchmark(estado.st_mtime_ns, estado.st_size)
+
+
+@lru_cache(maxsize=1)
+def _leer_benchmark(mtime, tamano):
+    with open(BENCHMARK_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def posicion_cliente(benchmark, codigo_cliente):
+    """Posición del cliente contra sus pares, lista para mostrar.
+
+    Usa el grupo más específico (sector, luego tamaño, luego todos) que tenga
+    al menos MIN_PARES clientes; si ninguno alcanza, la métrica se omite.
+    """
+    if not benchmark or codigo_cliente not in benchmark['clientes']:
+        return None
+    datos = benchmark['clientes'][codigo_cliente]
+
+    filas = []
+    for metrica, titulo in METRICAS.items():
+        for agrupacion in ('sector', 'tamano', 'todos'):
+            nombre_grupo = "Todos" if agrupacion == 'todos' else datos[agrupacion]
+            stats = benchmark['grupos'][agrupacion][nombre_grupo][metrica]
+            if stats['n'] >= MIN_PARES:
+                break
+        else:
+            continue
+        filas.append({
+            'metrica': metrica,
+            'titulo': titulo,
+            'valor': datos['metricas'][metrica]['valor'],
+            'percentil': datos['metricas'][metrica]['percentil'][agrupacion],
+            'grupo': nombre_grupo,
+            'agrupacion': agrupacion,
+            **stats,
+        })
+    return filas
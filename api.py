@@ -0,0 +1,204 @@
+"""API JSON de solo lectura con los datos procesados de cada cliente.
+
+Pensada para que otros sistemas (facturación, CRM) consulten las cifras sin
+pasar por Streamlit. Corre como un servicio local aparte:
+
+    python api.py --puerto 8600
+
+Rutas (el código de cliente es el mismo que usa el link del dashboard):
+
+    GET /clientes/<codigo>/datos        DataFrame de procesar_excel
+    GET /clientes/<codigo>/kpis         Indicadores principales
+    GET /clientes/<codigo>/alertas      Alertas del cliente
+    GET /clientes/<codigo>/documentos   Lista de documentos
+
+Si el Excel vigente del cliente no se puede leer la ruta responde un JSON
+``{"error": ...}`` con 422 (datos que no pasan la validación) o 500.
+
+Las respuestas llevan un ETag derivado de la versión de datos (If-None-Match
+devuelve 304, también con ``*`` o con validadores débiles ``W/"..."``) y se
+comprimen con gzip si el cliente lo acepta (respetando ``q=0``). Los Excel se
+leen con leer_excel_cacheado y las respuestas armadas se guardan en la caché
+en disco (cache_disco.py): ambas cachés las comparten la API, el dashboard y
+el panel admin de todos los procesos del host.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from alertas import ALERTAS_FILE, alertas_cliente, alertas_vigentes
+from cache_disco import obtener_o_calcular
+from metricas import calcular_kpis
+from procesamiento import (cargar_clientes, leer_excel_cacheado, obtener_archivo_cliente,
+                           obtener_documentos_cliente, version_datos)
+
+PUERTO = 8600
+
+RECURSOS = ('datos', 'kpis', 'alertas', 'documentos')
+
+# Cambiar si cambia el formato de las respuestas: invalida las guardadas en la caché en disco
+FORMATO_API = 1
+
+
+def _sin_nan(valor):
+    if hasattr(valor, 'item'):
+        valor = valor.item()
+    if isinstance(valor, float) and pd.isna(valor):
+        return None
+    return valor
+
+
+def _registros(df):
+    return [{k: _sin_nan(v) for k, v in fila.items()} for fila in df.to_dict('records')]
+
+
+def version_recurso(codigo_cliente, recurso):
+    """Versión de lo que devuelve cada ruta; es la base del ETag"""
+    if recurso == 'documentos':
+        documentos = obtener_documentos_cliente(codigo_cliente)
+        return "|".join(f"{d['nombre']}:{d['ruta'].stat().st_mtime_ns}" for d in documentos)
+
+    version = version_datos(obtener_archivo_cliente(codigo_cliente))
+    if recurso == 'alertas' and ALERTAS_FILE.exists():
+        # Las alertas también cambian si se reevalúan con otros umbrales
+        version = f"{version}|{ALERTAS_FILE.stat().st_mtime_ns}"
+    return version
+
+
+def armar_recurso(codigo_cliente, recurso, config):
+    """Contenido de la ruta como estructura serializable a JSON"""
+    if recurso == 'documentos':
+        return [
+            {'nombre': d['nombre'], 'tipo': d['tipo'], 'fecha': d['fecha']}
+            for d in obtener_documentos_cliente(codigo_cliente)
+        ]
+
+    archivo = obtener_archivo_cliente(codigo_cliente)
+    if archivo is None:
+        return None
+    version = version_datos(archivo)
+    df = leer_excel_cacheado(archivo, version)
+
+    if recurso == 'datos':
+        return _registros(df)
+    if recurso == 'kpis':
+        return {k: _sin_nan(v) for k, v in calcular_kpis(df).items()}
+    alertas = alertas_vigentes(codigo_cliente, version)
+    return alertas if alertas is not None else alertas_cliente(df, config)
+
+
+@lru_cache(maxsize=256)
+def _respuesta(codigo_cliente, recurso, version):
+    """Cuerpo JSON, su versión gzip y el ETag, cacheados por versión en memoria y en disco"""
+    def calcular():
+        cuerpo = json.dumps(
+            {'cliente': codigo_cliente, recurso: armar_recurso(codigo_cliente, recurso, cargar_clientes())},
+            ensure_ascii=False
+        ).encode('utf-8')
+        etag = '"' + hashlib.sha1(f"{codigo_cliente}|{recurso}|{version}".encode('utf-8')).hexdigest()[:20] + '"'
+        return cuerpo, gzip.compress(cuerpo, compresslevel=6), etag
+
+    return obtener_o_calcular('api', (FORMATO_API, codigo_cliente, recurso, version), calcular)
+
+
+def acepta_gzip(accept_encoding):
+    """True si el encabezado Accept-Encoding acepta gzip con calidad mayor a 0"""
+    calidades = {}
+    for parte in accept_encoding.split(','):
+        nombre, _, parametros = parte.partition(';')
+        calidad = 1.0
+        for parametro in parametros.split(';'):
+            clave, _, valor = parametro.partition('=')
+            if clave.strip().lower() == 'q':
+                try:
+                    calidad = float(valor)
+                except ValueError:
+                    calidad = 0.0
+        if nombre.strip():
+            calidades[nombre.strip().lower()] = calidad
+    if 'gzip' in calidades:
+        return calidades['gzip'] > 0
+    return calidades.get('*', 0) > 0
+
+
+def etag_coincide(if_none_match, etag):
+    """Comparación débil de If-None-Match: ``*`` coincide siempre y se ignora el prefijo W/"""
+    candidatos = [e.strip() for e in if_none_match.split(',') if e.strip()]
+    return '*' in candidatos or any(c.removeprefix('W/') == etag for c in candidatos)
+
+
+class ManejadorAPI(BaseHTTPRequestHandler):
+    server_version = "DashboardContableAPI/1.0"
+
+    def do_GET(self):
+        partes = [p for p in self.path.split('?')[0].split('/') if p]
+        if len(partes) != 3 or partes[0] != 'clientes' or partes[2] not in RECURSOS:
+            return self._error(404, "Ruta no encontrada")
+
+        codigo_cliente, recurso = partes[1], partes[2]
+        cliente = cargar_clientes()['clientes'].get(codigo_cliente)
+        if cliente is None:
+            return self._error(404, "Cliente no encontrado")
+        if not cliente['activo']:
+            return self._error(403, "Cuenta inactiva")
+
+        try:
+            cuerpo, comprimido, etag = _respuesta(codigo_cliente, recurso, version_recurso(codigo_cliente, recurso))
+        except ValueError as e:
+            # El Excel vigente no pasa la validación (meses repetidos, fechas inválidas)
+            return self._error(422, f"Los datos del cliente no son válidos: {e}")
+        except Exception as e:
+            return self._error(500, f"No se pudieron leer los datos del cliente: {e}")
+
+        if etag_coincide(self.headers.get('If-None-Match', ''), etag):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        usar_gzip = acepta_gzip(self.headers.get('Accept-Encoding', ''))
+        datos = comprimido if usar_gzip else cuerpo
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        if usar_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def _error(self, codigo, mensaje):
+        cuerpo = json.dumps({'error': mensaje}, ensure_ascii=False).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def crear_servidor(host='127.0.0.1', puerto=PUERTO):
+    return ThreadingHTTPServer((host, puerto), ManejadorAPI)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API JSON de solo lectura del Dashboard Contable")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=PUERTO)
+    args = parser.parse_args()
+
+    servidor = crear_servidor(args.host, args.puerto)
+    print(f"API escuchando en http://{args.host}:{args.puerto}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.server_close()
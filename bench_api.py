@@ -0,0 +1,76 @@
+"""Generador de carga local para medir el throughput de api.py.
+
+Levanta la API en un hilo (o usa una ya levantada con --url) y lanza
+peticiones concurrentes contra las rutas de un cliente, con y sin ETag:
+
+    python bench_api.py --cliente supply_petrolero_srl --hilos 8 --peticiones 2000
+"""
+import argparse
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from api import RECURSOS, crear_servidor
+
+
+def _pedir(url, etag=None):
+    headers = {'Accept-Encoding': 'gzip'}
+    if etag:
+        headers['If-None-Match'] = etag
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as r:
+            r.read()
+            estado, etag_resp = r.status, r.headers.get('ETag')
+    except urllib.error.HTTPError as e:
+        estado, etag_resp = e.code, e.headers.get('ETag')
+    return time.perf_counter() - inicio, estado, etag_resp
+
+
+def medir(base, cliente, hilos, peticiones, con_etag):
+    urls = [f"{base}/clientes/{cliente}/{recurso}" for recurso in RECURSOS]
+    etags = {url: _pedir(url)[2] for url in urls} if con_etag else {}
+
+    def trabajo(i):
+        url = urls[i % len(urls)]
+        return _pedir(url, etags.get(url))
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        resultados = list(pool.map(trabajo, range(peticiones)))
+    total = time.perf_counter() - inicio
+
+    latencias = sorted(r[0] * 1000 for r in resultados)
+    estados = {}
+    for _, estado, _ in resultados:
+        estados[estado] = estados.get(estado, 0) + 1
+    return {
+        'req/s': peticiones / total,
+        'p50 ms': statistics.median(latencias),
+        'p95 ms': latencias[int(len(latencias) * 0.95) - 1],
+        'estados': estados,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la API JSON")
+    parser.add_argument('--cliente', required=True)
+    parser.add_argument('--url', help="API ya levantada (si no, se levanta una local)")
+    parser.add_argument('--hilos', type=int, default=8)
+    parser.add_argument('--peticiones', type=int, default=2000)
+    args = parser.parse_args()
+
+    base = args.url
+    if base is None:
+        servidor = crear_servidor(puerto=0)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{servidor.server_address[1]}"
+
+    for con_etag in (False, True):
+        r = medir(base, args.cliente, args.hilos, args.peticiones, con_etag)
+        modo = "con If-None-Match" if con_etag else "sin ETag"
+        print(f"{modo:>18}: {r['req/s']:8.0f} req/s • p50 {r['p50 ms']:.2f} ms • "
+              f"p95 {r['p95 ms']:.2f} ms • estados {r['estados']}")
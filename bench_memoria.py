@@ -0,0 +1,85 @@
+"""Mide la memoria del dataset por sesión: copia por sesión vs. dataset compartido.
+
+Simula N sesiones del mismo cliente con el esquema anterior (cada sesión con
+su DataFrame float64, la copia del período y la tabla de strings) y con el
+actual (un DataFrame compacto compartido y vistas por sesión), e informa la
+memoria de los objetos y el RSS del proceso:
+
+    python bench_memoria.py --archivo Supply_ejemplo.xlsx --sesiones 200 --anios 10
+"""
+import argparse
+import gc
+import os
+
+import pandas as pd
+
+from dataset import compactar, memoria
+from metricas import agregar_metricas_temporales
+from procesamiento import convertir_fecha_español, formatear_monto, leer_excel
+
+
+def rss():
+    """RSS actual del proceso en bytes (Linux); 0 si no se puede leer"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+def serie_larga(archivo, anios):
+    """Repite los meses del Excel de ejemplo para simular un cliente con historia larga"""
+    df = leer_excel(archivo)
+    meses = pd.period_range(end=pd.Period(df['Mes'].iloc[-1], freq='M'), periods=anios * 12, freq='M')
+    repetido = df.iloc[[i % len(df) for i in range(len(meses))]].reset_index(drop=True)
+    repetido['Mes'] = meses.astype(str)
+    return repetido
+
+
+def sesion_copia(base):
+    """Esquema anterior: cada sesión arma y copia su propio DataFrame"""
+    df = agregar_metricas_temporales(base)
+    df['Mes'] = df['Mes'].apply(convertir_fecha_español)
+    periodo = df.iloc[len(df) // 2:].copy()
+    tabla = periodo[['Mes', 'Ventas', 'Compras CF', 'Compras Exentas', 'Sueldos y CS', 'Margen Operativo']].copy()
+    for col in tabla.columns[1:]:
+        tabla[col] = tabla[col].apply(formatear_monto)
+    return df, periodo, tabla
+
+
+def medir(base, sesiones):
+    gc.collect()
+    inicio = rss()
+    copias = [sesion_copia(base) for _ in range(sesiones)]
+    gc.collect()
+    bytes_copias = sum(memoria(x) for sesion in copias for x in sesion)
+    rss_copias = rss() - inicio
+    del copias
+    gc.collect()
+
+    inicio = rss()
+    compartido = compactar(agregar_metricas_temporales(base))
+    vistas = [compartido.iloc[len(compartido) // 2:] for _ in range(sesiones)]
+    gc.collect()
+    bytes_compartido = memoria(compartido)
+    rss_compartido = rss() - inicio
+    del vistas
+
+    return {
+        'copia_por_sesion': (bytes_copias, rss_copias),
+        'compartido': (bytes_compartido, rss_compartido),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de memoria del dataset por sesión")
+    parser.add_argument('--archivo', default='Supply_ejemplo.xlsx')
+    parser.add_argument('--sesiones', type=int, default=200)
+    parser.add_argument('--anios', type=int, default=10)
+    args = parser.parse_args()
+
+    base = serie_larga(args.archivo, args.anios)
+    resultado = medir(base, args.sesiones)
+    for modo, (objetos, delta_rss) in resultado.items():
+        print(f"{modo:>17}: objetos {objetos / 1024:10,.1f} KB total • {objetos / args.sesiones / 1024:8,.2f} KB/sesión "
+              f"• RSS +{delta_rss / 1024:10,.1f} KB")
@@ -0,0 +1,296 @@
+"""Caché en disco compartida por todos los procesos (réplicas) de un mismo host.
+
+Cuando corren varios servidores de Streamlit detrás de un balanceador, la
+caché en memoria de cada proceso se duplica y cada uno vuelve a leer los
+mismos Excel. Esta caché guarda en un SQLite local los DataFrames procesados,
+las métricas y las especificaciones de gráficos, con claves derivadas del
+hash del contenido (no de la ruta ni de la fecha del archivo).
+
+- SQLite en modo WAL: lectores y escritores concurrentes entre procesos, cada
+  escritura es una transacción atómica.
+- Las lecturas no escriben: la fecha de último uso de una entrada se
+  actualiza a lo sumo cada ``REFRESCAR_USO`` segundos, así los aciertos no
+  toman el lock de escritura de SQLite ni se encolan entre réplicas.
+- Recorte LRU: cuando el total supera ``LIMITE_BYTES`` se borran las entradas
+  usadas hace más tiempo. El total se lleva en la tabla ``meta`` con
+  triggers, sin sumar la tabla en cada escritura.
+- Las claves incluyen las versiones de Python, pandas y numpy: un pickle de
+  otra versión nunca se lee, y si uno no se puede leer se borra y cuenta
+  como fallo.
+- Aciertos y fallos por réplica en la tabla ``estadisticas``.
+
+Ubicación: ``CACHE_DIR`` (variable de entorno) o ``.cache/`` junto a la app.
+"""
+import argparse
+import atexit
+import hashlib
+import os
+import pickle
+import platform
+import socket
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from importlib import metadata
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+CACHE_DIR = Path(os.environ.get('CACHE_DIR', BASE_DIR / ".cache"))
+CACHE_FILE = CACHE_DIR / "resultados.sqlite"
+
+LIMITE_BYTES = int(os.environ.get('CACHE_LIMITE_MB', 512)) * 1024 * 1024
+
+# Cada cuántas operaciones se vuelcan las estadísticas de la réplica
+VOLCAR_CADA = 50
+
+# Segundos que puede quedar vieja la fecha de último uso antes de actualizarla en una lectura
+REFRESCAR_USO = 10 * 60
+
+REPLICA = os.environ.get('CACHE_REPLICA') or f"{socket.gethostname()}:{os.getpid()}"
+
+
+
+def _versiones_librerias():
+    versiones = [f"python={platform.python_version()}"]
+    for libreria in ('pandas', 'numpy'):
+        try:
+            versiones.append(f"{libreria}={metadata.version(libreria)}")
+        except metadata.PackageNotFoundError:
+            versiones.append(f"{libreria}=-")
+    return ",".join(versiones)
+
+
+# Espacio de claves: los pickles dependen de las versiones de las librerías
+ESPACIO_CLAVES = _versiones_librerias()
+
+_local = threading.local()
+_lock = threading.Lock()
+_contadores = {'aciertos': 0, 'fallos': 0, 'escrituras': 0}
+_pendientes = 0
+
+
+def _conexion():
+    con = getattr(_local, 'con', None)
+    if con is None:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(CACHE_FILE, timeout=30, isolation_level=None)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute("PRAGMA busy_timeout=30000")
+        con.execute("""CREATE TABLE IF NOT EXISTS entradas (
+            clave TEXT PRIMARY KEY, tipo TEXT, valor BLOB, bytes INTEGER, creado REAL, usado REAL)""")
+        con.execute("CREATE INDEX IF NOT EXISTS entradas_usado ON entradas (usado)")
+        _crear_total(con)
+        con.execute("""CREATE TABLE IF NOT EXISTS estadisticas (
+            replica TEXT PRIMARY KEY, aciertos INTEGER, fallos INTEGER, escrituras INTEGER, actualizado REAL)""")
+        _local.con = con
+    return con
+
+
+def _crear_total(con):
+    """Tabla meta con el total de bytes, mantenido por triggers sobre entradas"""
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        con.execute("CREATE TABLE IF NOT EXISTS meta (nombre TEXT PRIMARY KEY, valor INTEGER)")
+        con.execute("""CREATE TRIGGER IF NOT EXISTS entradas_alta AFTER INSERT ON entradas BEGIN
+            UPDATE meta SET valor = valor + NEW.bytes WHERE nombre = 'bytes'; END""")
+        con.execute("""CREATE TRIGGER IF NOT EXISTS entradas_baja AFTER DELETE ON entradas BEGIN
+            UPDATE meta SET valor = valor - OLD.bytes WHERE nombre = 'bytes'; END""")
+        con.execute("""CREATE TRIGGER IF NOT EXISTS entradas_cambio AFTER UPDATE OF bytes ON entradas BEGIN
+            UPDATE meta SET valor = valor + NEW.bytes - OLD.bytes WHERE nombre = 'bytes'; END""")
+        # Solo la primera vez (o en una base creada antes de la tabla meta) se suma la tabla
+        con.execute("INSERT OR IGNORE INTO meta SELECT 'bytes', COALESCE(SUM(bytes), 0) FROM entradas")
+        con.execute("COMMIT")
+    except sqlite3.Error:
+        con.execute("ROLLBACK")
+        raise
+
+
+def _total_bytes(con):
+    fila = con.execute("SELECT valor FROM meta WHERE nombre = 'bytes'").fetchone()
+    return fila[0] if fila else 0
+
+
+@lru_cache(maxsize=256)
+def _hash_archivo(ruta, version):
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def hash_contenido(archivo, version=None):
+    """SHA-256 del contenido del archivo, memorizado por (ruta, versión)"""
+    if version is None:
+        stat = Path(archivo).stat()
+        version = (stat.st_size, stat.st_mtime_ns)
+    return _hash_archivo(str(archivo), version)
+
+
+def armar_clave(tipo, *partes):
+    return hashlib.sha256("|".join([ESPACIO_CLAVES, tipo] + [str(p) for p in partes]).encode('utf-8')).hexdigest()
+
+
+def _contar(evento):
+    global _pendientes
+    with _lock:
+        _contadores[evento] += 1
+        _pendientes += 1
+        volcar = _pendientes >= VOLCAR_CADA
+    if volcar:
+        volcar_estadisticas()
+
+
+def volcar_estadisticas():
+    """Guarda los contadores de esta réplica en la base compartida"""
+    global _pendientes
+    with _lock:
+        datos = dict(_contadores)
+        _pendientes = 0
+    if not any(datos.values()):
+        return
+    try:
+        _conexion().execute(
+            "INSERT OR REPLACE INTO estadisticas VALUES (?, ?, ?, ?, ?)",
+            (REPLICA, datos['aciertos'], datos['fallos'], datos['escrituras'], time.time())
+        )
+    except sqlite3.Error:
+        pass
+
+
+atexit.register(volcar_estadisticas)
+
+
+def leer(clave):
+    """Valor guardado para ``clave``, o None si no está (o no se puede leer)"""
+    try:
+        con = _conexion()
+        fila = con.execute("SELECT valor, usado FROM entradas WHERE clave = ?", (clave,)).fetchone()
+    except sqlite3.Error:
+        _contar('fallos')
+        return None
+    if fila is None:
+        _contar('fallos')
+        return None
+
+    try:
+        valor = pickle.loads(fila[0])
+    except Exception:
+        # Pickle dañado o de otra versión de las librerías: se descarta
+        _borrar(con, clave)
+        _contar('fallos')
+        return None
+
+    ahora = time.time()
+    if ahora - fila[1] > REFRESCAR_USO:
+        try:
+            con.execute("UPDATE entradas SET usado = ? WHERE clave = ?", (ahora, clave))
+        except sqlite3.Error:
+            pass
+    _contar('aciertos')
+    return valor
+
+
+def _borrar(con, clave):
+    try:
+        con.execute("DELETE FROM entradas WHERE clave = ?", (clave,))
+    except sqlite3.Error:
+        pass
+
+
+def escribir(clave, tipo, valor):
+    try:
+        datos = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        ahora = time.time()
+        con = _conexion()
+        # Upsert (y no INSERT OR REPLACE) para que los triggers lleven bien el total
+        con.execute("""INSERT INTO entradas VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (clave) DO UPDATE SET tipo = excluded.tipo, valor = excluded.valor,
+                bytes = excluded.bytes, creado = excluded.creado, usado = excluded.usado""",
+                    (clave, tipo, datos, len(datos), ahora, ahora))
+        _contar('escrituras')
+        recortar()
+    except sqlite3.Error:
+        pass
+
+
+def obtener_o_calcular(tipo, partes_clave, calcular):
+    """Devuelve el valor cacheado o lo calcula con ``calcular()`` y lo guarda.
+
+    ``partes_clave`` debe incluir el hash del contenido de los datos de origen.
+    Los valores ``None`` no se guardan.
+    """
+    clave = armar_clave(tipo, *partes_clave)
+    valor = leer(clave)
+    if valor is None:
+        valor = calcular()
+        if valor is not None:
+            escribir(clave, tipo, valor)
+    return valor
+
+
+def recortar(limite=LIMITE_BYTES):
+    """Borra las entradas menos usadas hasta quedar por debajo del límite"""
+    con = _conexion()
+    if _total_bytes(con) <= limite:
+        return 0
+    borradas = 0
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        total = _total_bytes(con)
+        for clave, tamano in con.execute("SELECT clave, bytes FROM entradas ORDER BY usado ASC").fetchall():
+            if total <= limite * 0.9:
+                break
+            con.execute("DELETE FROM entradas WHERE clave = ?", (clave,))
+            total -= tamano
+            borradas += 1
+        con.execute("COMMIT")
+    except sqlite3.Error:
+        con.execute("ROLLBACK")
+    return borradas
+
+
+def estadisticas():
+    """Aciertos, fallos y tasa de aciertos por réplica, más el tamaño total"""
+    volcar_estadisticas()
+    con = _conexion()
+    replicas = []
+    for replica, aciertos, fallos, escrituras, actualizado in con.execute(
+            "SELECT * FROM estadisticas ORDER BY actualizado DESC"):
+        consultas = aciertos + fallos
+        replicas.append({
+            'replica': replica,
+            'aciertos': aciertos,
+            'fallos': fallos,
+            'escrituras': escrituras,
+            'tasa_aciertos': aciertos / consultas * 100 if consultas else None,
+            'actualizado': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(actualizado)),
+        })
+    entradas = con.execute("SELECT COUNT(*) FROM entradas").fetchone()[0]
+    return {'replicas': replicas, 'entradas': entradas, 'bytes': _total_bytes(con)}
+
+
+def vaciar():
+    con = _conexion()
+    con.execute("DELETE FROM entradas")
+    con.execute("DELETE FROM estadisticas")
+    con.execute("VACUUM")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estado de la caché en disco compartida")
+    parser.add_argument('--vaciar', action='store_true', help="Borra todas las entradas y estadísticas")
+    args = parser.parse_args()
+
+    if args.vaciar:
+        vaciar()
+        print("Caché vaciada")
+    else:
+        datos = estadisticas()
+        print(f"{datos['entradas']} entradas • {datos['bytes'] / 1024 / 1024:,.1f} MB en {CACHE_FILE}")
+        for r in datos['replicas']:
+            tasa = f"{r['tasa_aciertos']:.1f}%" if r['tasa_aciertos'] is not None else "-"
+            print(f"  {r['replica']}: {r['aciertos']} aciertos, {r['fallos']} fallos, "
+                  f"{r['escrituras']} escrituras • tasa {tasa} • {r['actualizado']}")
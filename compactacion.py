@@ -0,0 +1,276 @@
+"""Compactación de las versiones viejas de datos de cada cliente.
+
+Cada "Confirmar y Guardar" agrega un ``datos_<timestamp>.xlsx`` en
+``datos/<codigo>/``. Este proceso pasa las versiones que quedan fuera de la
+política de retención a un historial compacto y las saca de la carpeta:
+
+    datos/<codigo>/historial/valores.csv.gz   valores mes a mes de cada versión
+    datos/<codigo>/historial/manifiesto.json  archivo, hash SHA-256, tamaño y fechas
+    datos/<codigo>/historial/originales/      (opcional) los Excel originales
+
+El registro de auditoría son los valores más el hash de cada Excel. Solo si
+la política lo pide (``originales``) se conservan además los archivos
+originales, que se pasan a ``originales/`` con un enlace duro (sin copiar
+los bytes, así que esas versiones no liberan espacio) y nunca se reescriben.
+El manifiesto es lo último que se escribe y es el que manda: las filas y los
+originales de versiones que no figuran en él (de una corrida cortada a mitad
+de camino) se descartan en la corrida siguiente, así que nunca se duplican.
+El Excel vigente nunca se toca.
+
+Al confirmar una carga solo se compacta si la política tiene
+``automatica``; si no, se corre desde el panel admin o como tarea programada:
+
+    python compactacion.py --versiones 3
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import zipfile
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from procesamiento import CONCEPTOS, DATOS_DIR, cargar_clientes, leer_excel, listar_versiones
+
+# Política por defecto; se puede sobreescribir en clientes.json ("retencion")
+RETENCION = {
+    'versiones': 3,   # Excels que se conservan (incluido el vigente)
+    'meses': None,    # o, si se define, conservar los guardados en los últimos N meses
+    'originales': False,  # conservar además los Excel originales en historial/originales/
+    'automatica': False,  # compactar al confirmar cada carga
+}
+
+
+def obtener_retencion(config):
+    retencion = dict(RETENCION)
+    retencion.update(config.get('retencion', {}))
+    return retencion
+
+
+def _historial_dir(codigo_cliente):
+    return DATOS_DIR / codigo_cliente / "historial"
+
+
+def _fecha_version(archivo):
+    """Fecha de guardado: la del nombre datos_AAAAMMDD_HHMMSS o, si no, la de modificación"""
+    try:
+        return datetime.strptime(archivo.stem.replace('datos_', '', 1), '%Y%m%d_%H%M%S')
+    except ValueError:
+        return datetime.fromtimestamp(archivo.stat().st_mtime)
+
+
+def _sha256(archivo):
+    h = hashlib.sha256()
+    with open(archivo, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _escribir_atomico(ruta, escribir):
+    tmp = ruta.with_name(ruta.name + '.tmp')
+    escribir(tmp)
+    os.replace(tmp, ruta)
+
+
+def cargar_manifiesto(codigo_cliente):
+    ruta = _historial_dir(codigo_cliente) / "manifiesto.json"
+    if ruta.exists():
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'versiones': []}
+
+
+def cargar_historial(codigo_cliente, manifiesto=None):
+    """Valores de todas las versiones compactadas (formato largo: version, Mes, concepto, valor).
+
+    Solo las versiones del manifiesto: las filas de una corrida interrumpida se ignoran.
+    """
+    manifiesto = manifiesto or cargar_manifiesto(codigo_cliente)
+    ruta = _historial_dir(codigo_cliente) / "valores.csv.gz"
+    if not ruta.exists():
+        return pd.DataFrame(columns=['version', 'Mes', 'concepto', 'valor'])
+    valores = pd.read_csv(ruta, dtype={'version': str, 'Mes': str, 'concepto': str})
+    registradas = {v['archivo'] for v in manifiesto['versiones']}
+    return valores[valores['version'].isin(registradas)]
+
+
+def recuperar_original(codigo_cliente, archivo):
+    """Bytes del Excel original de una versión compactada, o None si no se conservó"""
+    ruta = _historial_dir(codigo_cliente) / "originales" / archivo
+    if ruta.exists():
+        return ruta.read_bytes()
+    # Historiales anteriores guardaban los originales en un zip
+    ruta_zip = _historial_dir(codigo_cliente) / "originales.zip"
+    if not ruta_zip.exists():
+        return None
+    with zipfile.ZipFile(ruta_zip) as zf:
+        if archivo not in zf.namelist():
+            return None
+        return zf.read(archivo)
+
+
+def _conservar_original(archivo, destino):
+    """Deja una copia del Excel en ``destino``: un enlace duro si el disco lo permite"""
+    destino.unlink(missing_ok=True)
+    try:
+        os.link(archivo, destino)
+    except OSError:
+        shutil.copy2(archivo, destino)
+
+
+def _tamano_historial(historial_dir):
+    return sum(r.stat().st_size for r in historial_dir.rglob('*') if r.is_file())
+
+
+def versiones_a_compactar(codigo_cliente, retencion):
+    """Excels que quedan fuera de la política (nunca el vigente)"""
+    versiones = listar_versiones(codigo_cliente)
+    anteriores = versiones[:-1]
+    if retencion.get('meses'):
+        limite = datetime.now() - timedelta(days=30 * int(retencion['meses']))
+        return [a for a in anteriores if _fecha_version(a) < limite]
+    conservar = max(int(retencion.get('versiones') or 1), 1)
+    return versiones[:max(len(versiones) - conservar, 0)]
+
+
+def compactar_cliente(codigo_cliente, retencion, simular=False):
+    """Pasa al historial y borra las versiones viejas de un cliente.
+
+    Devuelve un reporte con las versiones compactadas, las que no se pudieron
+    leer (se conservan) y los bytes liberados: lo que salió de la carpeta menos
+    lo que creció el historial (negativo si el historial creció más).
+    """
+    candidatas = versiones_a_compactar(codigo_cliente, retencion)
+    reporte = {'codigo': codigo_cliente, 'compactadas': [], 'con_error': [], 'bytes_liberados': 0}
+    if not candidatas:
+        return reporte
+
+    historial_dir = _historial_dir(codigo_cliente)
+    ruta_valores = historial_dir / "valores.csv.gz"
+    dir_originales = historial_dir / "originales"
+    ruta_manifiesto = historial_dir / "manifiesto.json"
+    manifiesto = cargar_manifiesto(codigo_cliente)
+    conservar_originales = retencion.get('originales', False)
+    ya_compactadas = {(v['archivo'], v['sha256']) for v in manifiesto['versiones']}
+    previo = {'versiones': list(manifiesto['versiones'])}
+
+    nuevas_filas = []
+    nuevos = []
+    a_borrar = []
+    for archivo in candidatas:
+        sha = _sha256(archivo)
+        tamano = archivo.stat().st_size
+        if (archivo.name, sha) in ya_compactadas:
+            # Quedó de una corrida interrumpida: ya está en el historial
+            a_borrar.append((archivo, tamano))
+            continue
+        try:
+            df = leer_excel(archivo)
+        except Exception as e:
+            reporte['con_error'].append({'archivo': archivo.name, 'error': str(e)})
+            continue
+
+        largo = df.melt(id_vars='Mes', value_vars=CONCEPTOS, var_name='concepto', value_name='valor')
+        largo.insert(0, 'version', archivo.name)
+        nuevas_filas.append(largo)
+        nuevos.append(archivo)
+        manifiesto['versiones'].append({
+            'archivo': archivo.name,
+            'sha256': sha,
+            'bytes': tamano,
+            'guardado': _fecha_version(archivo).strftime('%Y-%m-%d %H:%M:%S'),
+            'compactado': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'meses': [df['Mes'].iloc[0], df['Mes'].iloc[-1]] if len(df) else [],
+            'original': conservar_originales,
+        })
+        a_borrar.append((archivo, tamano))
+
+    reporte['compactadas'] = [a.name for a, _ in a_borrar]
+    if simular:
+        # Estimado: los Excel que se conservan como originales no liberan nada
+        reporte['bytes_liberados'] = sum(t for a, t in a_borrar if not (conservar_originales and a in nuevos))
+        return reporte
+
+    historial_dir.mkdir(parents=True, exist_ok=True)
+    tamano_previo = _tamano_historial(historial_dir)
+
+    # 1) Valores (atómico) y originales; el historial previo se filtra por el
+    #    manifiesto vigente, así lo que dejó una corrida cortada no se duplica
+    if nuevas_filas:
+        valores = pd.concat([cargar_historial(codigo_cliente, previo)] + nuevas_filas, ignore_index=True)
+        _escribir_atomico(ruta_valores, lambda tmp: valores.to_csv(tmp, index=False, compression='gzip'))
+
+        if dir_originales.exists():
+            registrados = {v['archivo'] for v in previo['versiones'] if v.get('original')}
+            for huerfano in dir_originales.iterdir():
+                if huerfano.name not in registrados:
+                    huerfano.unlink()
+        if conservar_originales:
+            dir_originales.mkdir(exist_ok=True)
+            for archivo in nuevos:
+                _conservar_original(archivo, dir_originales / archivo.name)
+
+        # 2) El manifiesto al final: recién ahí las versiones nuevas cuentan como compactadas
+        def escribir_manifiesto(tmp):
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+        _escribir_atomico(ruta_manifiesto, escribir_manifiesto)
+
+    # 3) Recién ahora se sacan los Excel de la carpeta del cliente
+    liberados = 0
+    for archivo, tamano in a_borrar:
+        archivo.unlink()
+        liberados += tamano
+
+    reporte['bytes_liberados'] = liberados - (_tamano_historial(historial_dir) - tamano_previo)
+    return reporte
+
+
+def describir_liberado(bytes_liberados):
+    """Texto para el reporte; un saldo negativo no se presenta como espacio liberado"""
+    if bytes_liberados >= 0:
+        return f"{bytes_liberados / 1024:,.1f} KB liberados"
+    return f"sin espacio liberado (el historial creció {-bytes_liberados / 1024:,.1f} KB)"
+
+
+def compactar_todos(config, retencion=None, simular=False):
+    """Compacta todos los clientes; devuelve un reporte por cliente con cambios"""
+    retencion = retencion or obtener_retencion(config)
+    reportes = []
+    for codigo in config['clientes']:
+        reporte = compactar_cliente(codigo, retencion, simular)
+        if reporte['compactadas'] or reporte['con_error']:
+            reportes.append(reporte)
+    return reportes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compacta las versiones viejas de datos de los clientes")
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument('--versiones', type=int, help="Excels a conservar por cliente (incluido el vigente)")
+    grupo.add_argument('--meses', type=int, help="Conservar los Excels guardados en los últimos N meses")
+    parser.add_argument('--originales', action='store_true',
+                        help="Conservar también los Excel originales (además de valores y hash)")
+    parser.add_argument('--simular', action='store_true', help="Solo informar, sin borrar nada")
+    args = parser.parse_args()
+
+    config = cargar_clientes()
+    retencion = obtener_retencion(config)
+    if args.versiones:
+        retencion.update(versiones=args.versiones, meses=None)
+    elif args.meses:
+        retencion.update(versiones=None, meses=args.meses)
+    if args.originales:
+        retencion['originales'] = True
+
+    total = 0
+    for reporte in compactar_todos(config, retencion, args.simular):
+        total += reporte['bytes_liberados']
+        print(f"{reporte['codigo']}: {len(reporte['compactadas'])} versiones compactadas, "
+              f"{describir_liberado(reporte['bytes_liberados'])}")
+        for error in reporte['con_error']:
+            print(f"  ⚠️ {error['archivo']} no se pudo leer (se conserva): {error['error']}")
+    print(f"Total: {describir_liberado(total)}" + (" (simulación)" if args.simular else ""))
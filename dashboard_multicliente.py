@@ -2,9 +2,20 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 from datetime import datetime
-import json
 import os
-from pathlib import Path
+
+from procesamiento import (cargar_clientes, convertir_fecha_español, formatear_monto, formatear_porcentaje,
+                           leer_excel_cacheado, obtener_archivo_cliente, obtener_documentos_cliente, version_datos)
+from metricas import VENTANAS, agregar_metricas_temporales, calcular_kpis, metricas_cliente
+from proyecciones import CONCEPTOS_PROYECCION, HORIZONTE_MAX, proyectar
+from alertas import alertas_cliente, alertas_vigentes
+from inflacion import cargar_ipc, deflactar, meses_base, meses_sin_ipc, version_ipc
+from dataset import compactar
+from analitica import cargar_benchmark, posicion_cliente
+from cache_disco import hash_contenido, obtener_o_calcular
+from agregados import (METODOS_REDUCCION, agregados_cliente, filtrar_periodo, niveles_disponibles, puntos_por_trazo,
+                       reducir)
+from grupos import desglose, obtener_grupos, serie_consolidada, versiones_miembros
 
 # Configuración de la página
 st.set_page_config(
@@ -14,140 +25,492 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Directorios
-BASE_DIR = Path(__file__).parent
-DATOS_DIR = BASE_DIR / "datos"
-CLIENTES_FILE = BASE_DIR / "clientes.json"
-
-def cargar_clientes():
-    if CLIENTES_FILE.exists():
-        with open(CLIENTES_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {"clientes": {}, "admin": {"codigo": "admin2024", "nombre": "Administrador"}}
+# Cambiar si cambia el cálculo de métricas, proyecciones o gráficos: invalida la caché en disco
+FORMATO_CACHE = 2
 
-def procesar_excel(archivo):
+def procesar_excel(archivo, version=None):
     try:
-        df = pd.read_excel(archivo, sheet_name=0, header=None)
-        fechas_raw = df.iloc[2, 2:].values
-        fechas = []
-        for fecha in fechas_raw:
-            if pd.notna(fecha):
-                if isinstance(fecha, datetime):
-                    fechas.append(fecha.strftime('%Y-%m'))
-                else:
-                    fechas.append(str(fecha)[:7])
-        
-        conceptos = {
-            'Ventas': df.iloc[3, 2:2+len(fechas)].values,
-            'Compras CF': df.iloc[4, 2:2+len(fechas)].values,
-            'Compras Exentas': df.iloc[5, 2:2+len(fechas)].values,
-            'Sueldos y CS': df.iloc[6, 2:2+len(fechas)].values,
-            'Margen Operativo': df.iloc[7, 2:2+len(fechas)].values
-        }
-        
-        data = {'Mes': fechas}
-        data.update(conceptos)
-        df_limpio = pd.DataFrame(data)
-        
-        for col in df_limpio.columns:
-            if col != 'Mes':
-                df_limpio[col] = pd.to_numeric(df_limpio[col], errors='coerce')
-        
-        df_limpio['Total Compras'] = df_limpio['Compras CF'] + df_limpio['Compras Exentas']
-        df_limpio['Margen Bruto'] = df_limpio['Ventas'] - df_limpio['Total Compras']
-        df_limpio['% Margen Bruto'] = (df_limpio['Margen Bruto'] / df_limpio['Ventas'] * 100).round(2)
-        df_limpio['% Margen Operativo'] = (df_limpio['Margen Operativo'] / df_limpio['Ventas'] * 100).round(2)
-        df_limpio['Ratio Ventas/Sueldos'] = (df_limpio['Ventas'] / df_limpio['Sueldos y CS']).round(2)
-        
-        return df_limpio
+        return leer_excel_cacheado(archivo, version)
     except Exception as e:
         st.error(f"Error al procesar el archivo: {str(e)}")
         return None
 
-def formatear_monto(valor):
-    if pd.isna(valor):
-        return "N/A"
-    return f"${valor/1_000_000:,.1f}M"
+@st.cache_resource(show_spinner=False, max_entries=64)
+def cargar_datos_cliente(archivo, version, mes_base=None, version_ipc=None):
+    """Lee el Excel y calcula las métricas temporales una sola vez por versión de datos.
 
-def formatear_porcentaje(valor):
-    if pd.isna(valor):
-        return "N/A"
-    return f"{valor:.1f}%"
-
-def convertir_fecha_español(fecha_str):
-    """Convierte formato YYYY-MM a Mes YYYY en español"""
-    meses_es = {
-        '01': 'Ene', '02': 'Feb', '03': 'Mar', '04': 'Abr',
-        '05': 'May', '06': 'Jun', '07': 'Jul', '08': 'Ago',
-        '09': 'Sep', '10': 'Oct', '11': 'Nov', '12': 'Dic'
-    }
-    try:
-        year, month = fecha_str.split('-')
-        return f"{meses_es[month]} {year}"
-    except:
-        return fecha_str
-
-def generar_alertas(df):
-    alertas = []
-    meses_negativos = df[df['Margen Operativo'] < 0]
-    if len(meses_negativos) > 0:
-        for idx, row in meses_negativos.iterrows():
-            alertas.append({
-                'tipo': 'warning',
-                'titulo': '⚠️ Margen Operativo Negativo',
-                'mensaje': f"El mes {row['Mes']} tuvo margen operativo negativo: {formatear_monto(row['Margen Operativo'])}"
-            })
-    
-    if len(df) > 1 and df.iloc[-1]['Margen Operativo'] > 0:
-        if any(df.iloc[:-1]['Margen Operativo'] < 0):
-            alertas.append({
-                'tipo': 'success',
-                'titulo': '✅ Recuperación de Margen',
-                'mensaje': f"El último mes ({df.iloc[-1]['Mes']}) volvió a margen operativo positivo: {formatear_monto(df.iloc[-1]['Margen Operativo'])}"
-            })
-    return alertas
+    ``version`` y ``version_ipc`` no se usan adentro: son las claves que
+    invalidan la caché cuando se guarda un Excel nuevo o se actualiza el IPC.
+    Con ``mes_base`` los montos se expresan en pesos constantes de ese mes.
 
-def obtener_archivo_cliente(codigo_cliente):
-    cliente_dir = DATOS_DIR / codigo_cliente
-    if cliente_dir.exists():
-        archivos = list(cliente_dir.glob("*.xlsx"))
-        if archivos:
-            return archivos[0]
-    return None
-
-def obtener_documentos_cliente(codigo_cliente):
-    """Obtiene lista de PDFs disponibles para el cliente"""
-    cliente_dir = DATOS_DIR / codigo_cliente / "documentos"
-    documentos = []
+    El DataFrame (en tipos compactos) es uno solo para todas las sesiones:
+    se filtra con vistas y nunca se modifica. Además queda en la caché en
+    disco, así las otras réplicas no lo vuelven a calcular.
+    """
+    def calcular():
+        df = procesar_excel(archivo, version)
+        if df is None:
+            return None
+        if mes_base:
+            return compactar(agregar_metricas_temporales(deflactar(df, mes_base)))
+        # En pesos corrientes se usan las métricas que el panel admin deja listas al guardar
+        return compactar(metricas_cliente(archivo, version))
     
-    if cliente_dir.exists():
-        # Buscar PDFs
-        pdfs = list(cliente_dir.glob("*.pdf"))
-        for pdf in pdfs:
-            # Determinar tipo de documento
-            nombre = pdf.stem.lower()
-            if 'arca' in nombre or 'arba' in nombre:
-                tipo = "Constancia ARCA"
-                icono = "📄"
-            elif 'pyme' in nombre:
-                tipo = "Certificado PyME"
-                icono = "🏭"
-            elif 'reporte' in nombre or 'informe' in nombre:
-                tipo = "Reporte Mensual"
-                icono = "📊"
-            else:
-                tipo = "Documento"
-                icono = "📎"
-            
-            documentos.append({
-                'nombre': pdf.name,
-                'tipo': tipo,
-                'icono': icono,
-                'ruta': pdf,
-                'fecha': datetime.fromtimestamp(pdf.stat().st_mtime).strftime('%d/%m/%Y')
-            })
+    clave = (hash_contenido(archivo, version), FORMATO_CACHE, mes_base, version_ipc)
+    return obtener_o_calcular('dataset', clave, calcular)
+
+@st.cache_data(show_spinner=False)
+def proyectar_cliente(archivo, version, horizonte, mes_base=None, version_ipc=None):
+    """Proyección del cliente, cacheada (también en disco) por datos, horizonte y mes base"""
+    def calcular():
+        df = procesar_excel(archivo, version)
+        if df is None:
+            return None
+        if mes_base:
+            df = deflactar(df, mes_base)
+        proyeccion = proyectar({'cliente': df}, horizonte).get('cliente')
+        if proyeccion:
+            proyeccion['meses'] = [convertir_fecha_español(m) for m in proyeccion['meses']]
+            for concepto in CONCEPTOS_PROYECCION:
+                proyeccion[concepto]['meses'] = [convertir_fecha_español(m) for m in proyeccion[concepto]['meses']]
+        return proyeccion
     
-    return sorted(documentos, key=lambda x: x['tipo'])
+    clave = (hash_contenido(archivo, version), FORMATO_CACHE, horizonte, mes_base, version_ipc)
+    return obtener_o_calcular('proyeccion', clave, calcular)
+
+def grafico_cacheado(nombre, clave, construir):
+    """Especificación (dict de Plotly) del gráfico, guardada en la caché en disco.
+
+    ``clave`` identifica los datos y filtros con los que se arma; ``construir``
+    devuelve la figura y solo se llama si ninguna réplica la calculó antes.
+    """
+    return obtener_o_calcular('grafico', (nombre, FORMATO_CACHE) + tuple(clave),
+                              lambda: construir().to_plotly_json())
+
+def agregar_proyeccion(fig, proyeccion, concepto, df, color):
+    """Agrega al gráfico la proyección punteada y su banda de confianza.
+
+    La línea sale del último mes con dato del concepto, que puede ser anterior
+    al último mes de la serie.
+    """
+    datos = proyeccion[concepto]
+    ultimo = df[concepto].last_valid_index()
+    ancla_mes = [] if ultimo is None else [df.loc[ultimo, 'Mes']]
+    ancla_valor = [] if ultimo is None else [df.loc[ultimo, concepto]]
+    meses = ancla_mes + datos['meses']
+    fig.add_trace(go.Scatter(
+        x=meses, y=ancla_valor + datos['superior'],
+        mode='lines', line=dict(width=0),
+        showlegend=False, hoverinfo='skip'
+    ))
+    fig.add_trace(go.Scatter(
+        x=meses, y=ancla_valor + datos['inferior'],
+        mode='lines', line=dict(width=0),
+        fill='tonexty', fillcolor='rgba(128, 128, 128, 0.2)',
+        name='Banda 80%', hoverinfo='skip'
+    ))
+    fig.add_trace(go.Scatter(
+        x=meses, y=ancla_valor + datos['valor'],
+        mode='lines+markers',
+        name='Proyección',
+        line=dict(color=color, width=2, dash='dash'),
+        marker=dict(size=6)
+    ))
+
+@st.cache_data(show_spinner=False)
+def calcular_alertas_cliente(archivo, version):
+    """Evalúa las reglas solo para este cliente (cuando no hay resultado precalculado vigente)"""
+    df = procesar_excel(archivo, version)
+    if df is None:
+        return []
+    return alertas_cliente(df, cargar_clientes())
+
+def obtener_alertas(codigo_cliente, archivo, version):
+    """Alertas precalculadas del cliente, si corresponden a su versión de datos vigente"""
+    alertas = alertas_vigentes(codigo_cliente, version)
+    if alertas is None:
+        alertas = calcular_alertas_cliente(archivo, version)
+    return alertas
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def cargar_agregados(archivo, version, mes_base=None, version_ipc=None):
+    """Agregados por día/semana/mes/trimestre/año, precalculados una vez por versión de datos"""
+    return agregados_cliente(archivo, version, mes_base, version_ipc)
+
+NOMBRES_NIVEL = {'diaria': "Día", 'semanal': "Semana", 'mensual': "Mes", 'trimestral': "Trimestre", 'anual': "Año"}
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def cargar_datos_grupo(codigo_grupo, versiones):
+    """Serie consolidada del grupo (compacta), matriz por empresa y miembros omitidos.
+
+    ``versiones`` (la de cada miembro) no se usa adentro: es la clave que
+    invalida la caché cuando cambian los datos o los miembros del grupo.
+    """
+    resultado = serie_consolidada(cargar_clientes(), codigo_grupo)
+    if resultado is None:
+        return None
+    consolidado, matriz, omitidas = resultado
+    return (compactar(consolidado) if consolidado is not None else None), matriz, omitidas
+
+# ============== SECCIONES COMPARTIDAS (cliente y grupo) ==============
+
+def filtro_periodo(df_completo):
+    """Selectores Desde/Hasta (dentro del sidebar): devuelve (df, idx_desde, idx_hasta)"""
+    st.markdown("#### 📅 Filtrar Período")
+    meses_disponibles = df_completo['Mes'].tolist()
+
+    mes_desde = st.selectbox("Desde:", options=meses_disponibles, index=0)
+    mes_hasta = st.selectbox("Hasta:", options=meses_disponibles, index=len(meses_disponibles)-1)
+
+    idx_desde = meses_disponibles.index(mes_desde)
+    idx_hasta = meses_disponibles.index(mes_hasta)
+
+    if idx_desde > idx_hasta:
+        st.error("⚠️ 'Desde' debe ser anterior a 'Hasta'")
+        idx_desde, idx_hasta = 0, len(meses_disponibles) - 1
+    df = df_completo.iloc[idx_desde:idx_hasta+1]
+
+    st.info(f"📊 Mostrando **{len(df)} meses**")
+    return df, idx_desde, idx_hasta
+
+def mostrar_kpis(df, titulo, nota=None):
+    """Fila de indicadores principales; los ratios salen de los totales del período"""
+    st.markdown(f"### {titulo}")
+    if nota:
+        st.caption(nota)
+    col1, col2, col3, col4, col5 = st.columns(5)
+
+    kpis = calcular_kpis(df)
+    ventas_total = kpis['ventas_total']
+    ventas_promedio = kpis['ventas_promedio']
+    compras_total = kpis['compras_total']
+    margen_bruto_total = kpis['margen_bruto_total']
+    margen_bruto_pct = kpis['margen_bruto_pct']
+    margen_operativo_total = kpis['margen_operativo_total']
+    margen_operativo_pct = kpis['margen_operativo_pct']
+    ratio_sueldos_ventas = kpis['sueldos_ventas_pct']
+
+    with col1:
+        st.metric("Ventas Totales", formatear_monto(ventas_total),
+                 delta=f"Prom: {formatear_monto(ventas_promedio)}")
+    with col2:
+        st.metric("Compras Totales", formatear_monto(compras_total))
+    with col3:
+        st.metric("Margen Bruto", formatear_monto(margen_bruto_total),
+                 delta=f"{margen_bruto_pct:.1f}%")
+    with col4:
+        color = "normal" if margen_operativo_total >= 0 else "inverse"
+        st.metric("Margen Operativo", formatear_monto(margen_operativo_total),
+                 delta=f"{margen_operativo_pct:.1f}%", delta_color=color)
+    with col5:
+        st.metric("Sueldos / Ventas", f"{ratio_sueldos_ventas:.1f}%")
+
+def seccion_ventas_compras(df, titulo, proyeccion=None):
+    st.markdown(f"### {titulo}")
+    col_izq, col_der = st.columns(2)
+
+    with col_izq:
+        st.markdown("#### Evolución de Ventas")
+        promedio_ventas = df['Ventas'].mean()
+
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=df['Mes'], y=df['Ventas'],
+            mode='lines+markers',
+            name='Ventas',
+            line=dict(color='#0066cc', width=3),
+            marker=dict(size=8)
+        ))
+        fig.add_trace(go.Scatter(
+            x=df['Mes'], y=[promedio_ventas]*len(df),
+            mode='lines',
+            name='Promedio',
+            line=dict(color='red', width=2, dash='dash')
+        ))
+        if proyeccion:
+            agregar_proyeccion(fig, proyeccion, 'Ventas', df, '#0066cc')
+        fig.update_layout(height=350, hovermode='x unified')
+        st.plotly_chart(fig, use_container_width=True)
+
+    with col_der:
+        st.markdown("#### Evolución de Compras")
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=df['Mes'], y=df['Compras CF'],
+            mode='lines+markers',
+            name='Compras CF',
+            line=dict(color='green', width=2),
+            stackgroup='one'
+        ))
+        fig.add_trace(go.Scatter(
+            x=df['Mes'], y=df['Compras Exentas'],
+            mode='lines+markers',
+            name='Compras Exentas',
+            line=dict(color='orange', width=2),
+            stackgroup='one'
+        ))
+        fig.update_layout(height=350, hovermode='x unified')
+        st.plotly_chart(fig, use_container_width=True)
+
+def seccion_sueldos(df, titulo):
+    st.markdown(f"### {titulo}")
+
+    st.markdown("#### Sueldos como % de Ventas")
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=df['Mes'], y=df['% Sueldos/Ventas'],
+        marker_color='#3498db',
+        text=df['% Sueldos/Ventas'].apply(lambda x: f"{x:.1f}%"),
+        textposition='outside',
+        textfont=dict(size=12)
+    ))
+    fig.add_hline(y=df['% Sueldos/Ventas'].mean(),
+                line_dash="dash",
+                line_color="red",
+                annotation_text="Promedio",
+                annotation_position="right")
+    fig.update_layout(
+        height=400,
+        yaxis_title="Porcentaje (%)",
+        showlegend=False,
+        yaxis=dict(range=[0, df['% Sueldos/Ventas'].max() * 1.2])
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+def seccion_rentabilidad(df, titulo, proyeccion=None):
+    st.markdown(f"### {titulo}")
+    col_izq, col_der = st.columns(2)
+
+    with col_izq:
+        st.markdown("#### Margen Operativo")
+        promedio_margen = df['Margen Operativo'].mean()
+        colores = ['green' if x > 0 else 'red' for x in df['Margen Operativo']]
+
+        fig = go.Figure()
+        fig.add_trace(go.Bar(
+            x=df['Mes'], y=df['Margen Operativo'],
+            marker_color=colores,
+            name='Margen Operativo'
+        ))
+        fig.add_trace(go.Scatter(
+            x=df['Mes'], y=[promedio_margen]*len(df),
+            mode='lines',
+            name='Promedio',
+            line=dict(color='blue', width=2, dash='dash')
+        ))
+        if proyeccion:
+            agregar_proyeccion(fig, proyeccion, 'Margen Operativo', df, 'green')
+        fig.add_hline(y=0, line_dash="solid", line_color="black", line_width=1)
+        fig.update_layout(height=350, hovermode='x unified')
+        st.plotly_chart(fig, use_container_width=True)
+
+    with col_der:
+        st.markdown("#### Evolución de Márgenes (%)")
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=df['Mes'], y=df['% Margen Bruto'],
+            mode='lines+markers',
+            name='% Margen Bruto',
+            line=dict(color='blue', width=2)
+        ))
+        fig.add_trace(go.Scatter(
+            x=df['Mes'], y=df['% Margen Operativo'],
+            mode='lines+markers',
+            name='% Margen Operativo',
+            line=dict(color='green', width=2)
+        ))
+        fig.update_layout(height=350, hovermode='x unified')
+        st.plotly_chart(fig, use_container_width=True)
+
+def seccion_tendencias(df, titulo, clave_datos):
+    """Tendencias móviles; los gráficos se cachean en disco por ``clave_datos`` (datos y período) y ventana"""
+    st.markdown(f"### {titulo}")
+    st.markdown("Promedios y acumulados móviles, variación interanual y márgenes de los últimos 12 meses.")
+
+    ventana = st.radio("Ventana móvil:", options=VENTANAS, index=1,
+                       format_func=lambda n: f"{n} meses", horizontal=True)
+    clave_vista = tuple(clave_datos) + (ventana,)
+    col_izq, col_der = st.columns(2)
+
+    def grafico_ventas_moviles():
+        fig = go.Figure()
+        fig.add_trace(go.Bar(
+            x=df['Mes'], y=df['Ventas'],
+            name='Ventas',
+            marker_color='lightblue'
+        ))
+        fig.add_trace(go.Scatter(
+            x=df['Mes'], y=df[f'Ventas Prom {ventana}M'],
+            mode='lines+markers',
+            name=f'Promedio {ventana}M',
+            line=dict(color='#0066cc', width=3)
+        ))
+        fig.update_layout(height=350, hovermode='x unified')
+        return fig
+
+    def grafico_margen_acumulado():
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=df['Mes'], y=df[f'Margen Operativo Acum {ventana}M'],
+            mode='lines+markers',
+            name=f'Acumulado {ventana}M',
+            line=dict(color='green', width=3)
+        ))
+        fig.add_hline(y=0, line_dash="solid", line_color="black", line_width=1)
+        fig.update_layout(height=350, hovermode='x unified')
+        return fig
+
+    def grafico_interanual():
+        fig = go.Figure()
+        fig.add_trace(go.Bar(
+            x=df['Mes'], y=df['Var. Interanual Ventas (%)'],
+            name='Ventas',
+            marker_color='#0066cc'
+        ))
+        fig.add_trace(go.Bar(
+            x=df['Mes'], y=df['Var. Interanual Margen Operativo (%)'],
+            name='Margen Operativo',
+            marker_color='green'
+        ))
+        fig.update_layout(height=350, hovermode='x unified', yaxis_title="Porcentaje (%)")
+        return fig
+
+    def grafico_margenes_ttm():
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=df['Mes'], y=df['% Margen Bruto TTM'],
+            mode='lines+markers',
+            name='% Margen Bruto TTM',
+            line=dict(color='blue', width=2)
+        ))
+        fig.add_trace(go.Scatter(
+            x=df['Mes'], y=df['% Margen Operativo TTM'],
+            mode='lines+markers',
+            name='% Margen Operativo TTM',
+            line=dict(color='green', width=2)
+        ))
+        fig.update_layout(height=350, hovermode='x unified', yaxis_title="Porcentaje (%)")
+        return fig
+
+    with col_izq:
+        st.markdown(f"#### Ventas y Promedio Móvil {ventana}M")
+        st.plotly_chart(grafico_cacheado('ventas_moviles', clave_vista, grafico_ventas_moviles),
+                        use_container_width=True)
+
+    with col_der:
+        st.markdown(f"#### Margen Operativo Acumulado {ventana}M")
+        st.plotly_chart(grafico_cacheado('margen_acumulado', clave_vista, grafico_margen_acumulado),
+                        use_container_width=True)
+
+    col_izq, col_der = st.columns(2)
+
+    with col_izq:
+        st.markdown("#### Variación Interanual (%)")
+        if df['Var. Interanual Ventas (%)'].notna().any():
+            st.plotly_chart(grafico_cacheado('interanual', clave_vista, grafico_interanual),
+                            use_container_width=True)
+        else:
+            st.info("📭 Se necesitan datos del mismo mes del año anterior")
+
+    with col_der:
+        st.markdown("#### Márgenes Últimos 12 Meses (TTM)")
+        if df['% Margen Operativo TTM'].notna().any():
+            st.plotly_chart(grafico_cacheado('margenes_ttm', clave_vista, grafico_margenes_ttm),
+                            use_container_width=True)
+        else:
+            st.info("📭 Se necesitan al menos 12 meses consecutivos de datos")
+
+# Formatear % Margen Operativo con iconos
+def formato_margen_icono(val):
+    if pd.isna(val):
+        return "N/A"
+    if val >= 20:
+        return f"🟢 {val:.1f}%"
+    elif val >= 10:
+        return f"🔵 {val:.1f}%"
+    elif val >= 0:
+        return f"🟡 {val:.1f}%"
+    else:
+        return f"🔴 {val:.1f}%"
+
+# Formatear % Sueldos/Ventas con iconos
+def formato_sueldos_icono(val):
+    if pd.isna(val):
+        return "N/A"
+    if val <= 10:
+        return f"🟢 {val:.1f}%"
+    elif val <= 15:
+        return f"🔵 {val:.1f}%"
+    elif val <= 20:
+        return f"🟡 {val:.1f}%"
+    else:
+        return f"🔴 {val:.1f}%"
+
+def seccion_resumen(df, titulo, columnas_extra=None):
+    """Tabla completa y mejores/peores meses; ``columnas_extra`` es {columna: formato}"""
+    st.markdown(f"### {titulo}")
+
+    # Tabla de datos
+    st.markdown("#### 📊 Datos Completos")
+
+    # Seleccionar columnas en el orden correcto; el formato se aplica al
+    # mostrar (Styler), sin armar una copia de strings del DataFrame
+    columnas = ['Mes', 'Ventas', 'Compras CF', 'Compras Exentas', 'Sueldos y CS',
+                'Margen Operativo', '% Margen Operativo', '% Sueldos/Ventas',
+                'Var. Interanual Ventas (%)', '% Margen Operativo TTM']
+    formatos = {col: formatear_monto for col in ['Ventas', 'Compras CF', 'Compras Exentas',
+                                                 'Sueldos y CS', 'Margen Operativo']}
+    formatos.update({
+        '% Margen Operativo': formato_margen_icono,
+        '% Sueldos/Ventas': formato_sueldos_icono,
+        'Var. Interanual Ventas (%)': formatear_porcentaje,
+        '% Margen Operativo TTM': formatear_porcentaje,
+    })
+    if columnas_extra:
+        columnas += list(columnas_extra)
+        formatos.update(columnas_extra)
+    df_display = df[columnas].style.format(formatos)
+
+    st.dataframe(df_display, use_container_width=True, hide_index=True)
+
+    # Leyenda de colores
+    st.markdown("""
+    **Leyenda:**  
+    🟢 Excelente • 🔵 Bueno • 🟡 Aceptable • 🔴 Requiere atención
+    """)
+
+    # Resumen de mejores y peores meses
+    st.divider()
+    st.markdown("#### 📈 Análisis de Períodos")
+
+    col1, col2, col3 = st.columns(3)
+
+    mejor_mes_ventas = df.loc[df['Ventas'].idxmax()]
+    peor_mes_ventas = df.loc[df['Ventas'].idxmin()]
+    mejor_margen = df.loc[df['Margen Operativo'].idxmax()]
+    peor_margen = df.loc[df['Margen Operativo'].idxmin()]
+    mejor_sueldo_eficiencia = df.loc[df['% Sueldos/Ventas'].idxmin()]
+    peor_sueldo_eficiencia = df.loc[df['% Sueldos/Ventas'].idxmax()]
+
+    with col1:
+        st.markdown("##### 🎯 Ventas")
+        st.success(f"**✅ Mejor:** {mejor_mes_ventas['Mes']}  \n{formatear_monto(mejor_mes_ventas['Ventas'])}")
+        st.warning(f"**⚠️ Menor:** {peor_mes_ventas['Mes']}  \n{formatear_monto(peor_mes_ventas['Ventas'])}")
+
+    with col2:
+        st.markdown("##### 💹 Rentabilidad")
+        st.success(f"**✅ Mejor:** {mejor_margen['Mes']}  \n{formatear_monto(mejor_margen['Margen Operativo'])}")
+        st.warning(f"**⚠️ Menor:** {peor_margen['Mes']}  \n{formatear_monto(peor_margen['Margen Operativo'])}")
+
+    with col3:
+        st.markdown("##### 💡 Eficiencia Sueldos")
+        st.success(f"**✅ Más eficiente:** {mejor_sueldo_eficiencia['Mes']}  \n{mejor_sueldo_eficiencia['% Sueldos/Ventas']:.1f}%")
+        st.warning(f"**⚠️ Menos eficiente:** {peor_sueldo_eficiencia['Mes']}  \n{peor_sueldo_eficiencia['% Sueldos/Ventas']:.1f}%")
+
+def pie_de_pagina():
+    st.divider()
+    st.caption("Dashboard Contable Profesional • Gestión Financiera Empresarial")
 
 # Obtener parámetro de cliente
 query_params = st.query_params
@@ -166,6 +529,112 @@ if not codigo_cliente:
     """)
     st.stop()
 
+# ============== GRUPO DE EMPRESAS (vista consolidada) ==============
+grupos = obtener_grupos(config)
+if codigo_cliente in grupos:
+    grupo = grupos[codigo_cliente]
+
+    if not grupo.get('activo', True):
+        st.warning("⚠️ Cuenta inactiva")
+        st.markdown("Tu cuenta está temporalmente inactiva. Contacta a tu contador.")
+        st.stop()
+
+    st.title("📊 Dashboard Financiero")
+    st.subheader(f"**{grupo['nombre']}** • Consolidado")
+    st.divider()
+
+    versiones = versiones_miembros(config, codigo_cliente)
+    resultado = cargar_datos_grupo(codigo_cliente, versiones)
+
+    if resultado is not None:
+        df_completo, matriz, omitidas = resultado
+        # Un Excel ilegible deja afuera a esa empresa, no a todo el grupo
+        for codigo, error in omitidas:
+            st.warning(f"⚠️ No se pudieron leer los datos de {config['clientes'][codigo]['nombre']}: "
+                       f"no se incluye en el consolidado ({error})")
+
+    if resultado is None or df_completo is None:
+        st.info("📁 Aún no hay datos disponibles de las empresas del grupo")
+        pie_de_pagina()
+        st.stop()
+
+    nombres = {codigo: config['clientes'][codigo]['nombre'] for codigo in matriz.codigos}
+
+    with st.sidebar:
+        st.markdown("### ℹ️ Información")
+        st.markdown(f"**Grupo:** {grupo['nombre']}  \n**Empresas:** {len(matriz.codigos)}")
+        for nombre in nombres.values():
+            st.caption(f"🏢 {nombre}")
+
+        st.divider()
+        df, idx_desde, idx_hasta = filtro_periodo(df_completo)
+
+    incompletos = df.loc[df['Empresas'] < len(matriz.codigos), 'Mes'].tolist()
+    if incompletos:
+        st.warning(f"En {', '.join(incompletos)} no informaron todas las empresas: "
+                   "el consolidado de esos meses es parcial.")
+
+    # KPIs consolidados (los ratios salen de los totales, no del promedio de las empresas)
+    mostrar_kpis(df, "📈 Indicadores Consolidados")
+
+    st.divider()
+
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["💰 Ventas y Compras", "🧑‍💼 Sueldos", "💹 Rentabilidad",
+                                                  "🧩 Por Empresa", "📆 Tendencias", "📋 Resumen Ejecutivo"])
+
+    with tab1:
+        seccion_ventas_compras(df, "Ventas y Compras del Grupo")
+
+    with tab2:
+        seccion_sueldos(df, "Sueldos del Grupo")
+
+    with tab3:
+        seccion_rentabilidad(df, "Rentabilidad del Grupo")
+
+    with tab4:
+        st.markdown("### Aporte de cada Empresa")
+        col_izq, col_der = st.columns(2)
+
+        for columna, concepto in ((col_izq, 'Ventas'), (col_der, 'Margen Operativo')):
+            with columna:
+                st.markdown(f"#### {concepto} por Empresa")
+                por_empresa = desglose(matriz, concepto, nombres).iloc[idx_desde:idx_hasta+1]
+                fig = go.Figure()
+                for empresa in por_empresa.columns:
+                    fig.add_trace(go.Bar(x=df['Mes'], y=por_empresa[empresa].to_numpy(), name=empresa))
+                fig.update_layout(height=400, hovermode='x unified', barmode='relative')
+                st.plotly_chart(fig, use_container_width=True)
+
+        # Totales del período por empresa, en bloque sobre la matriz
+        st.markdown("#### Totales del Período")
+        ventas = desglose(matriz, 'Ventas', nombres).iloc[idx_desde:idx_hasta+1].sum()
+        margen = desglose(matriz, 'Margen Operativo', nombres).iloc[idx_desde:idx_hasta+1].sum()
+        sueldos = desglose(matriz, 'Sueldos y CS', nombres).iloc[idx_desde:idx_hasta+1].sum()
+        tabla = pd.DataFrame({
+            'Empresa': ventas.index,
+            'Ventas': ventas.to_numpy(),
+            '% del Grupo': (ventas / ventas.sum() * 100).to_numpy(),
+            'Margen Operativo': margen.to_numpy(),
+            '% Margen Operativo': (margen / ventas.where(ventas != 0) * 100).to_numpy(),
+            '% Sueldos/Ventas': (sueldos / ventas.where(ventas != 0) * 100).to_numpy(),
+        })
+        st.dataframe(tabla.style.format({
+            'Ventas': formatear_monto,
+            '% del Grupo': formatear_porcentaje,
+            'Margen Operativo': formatear_monto,
+            '% Margen Operativo': formatear_porcentaje,
+            '% Sueldos/Ventas': formatear_porcentaje,
+        }), use_container_width=True, hide_index=True)
+
+    with tab5:
+        seccion_tendencias(df, "Tendencias del Grupo", ('grupo', codigo_cliente, versiones, idx_desde, idx_hasta))
+
+    with tab6:
+        seccion_resumen(df, "Resumen Ejecutivo del Grupo", {'Empresas': "{:.0f}"})
+
+    pie_de_pagina()
+    st.stop()
+
 if codigo_cliente not in config['clientes']:
     st.error("❌ Cliente no encontrado")
     st.markdown("El código de cliente proporcionado no es válido.")
@@ -273,34 +742,46 @@ else:
     archivo_cliente = obtener_archivo_cliente(codigo_cliente)
     
     if archivo_cliente:
-        df_completo = procesar_excel(archivo_cliente)
+        version = version_datos(archivo_cliente)
+        
+        # Valores constantes: deflactar con el IPC a un mes base
+        mes_base = None
+        ipc = cargar_ipc()
+        with st.sidebar:
+            st.divider()
+            st.markdown("#### 💲 Valores")
+            if len(ipc):
+                if st.toggle("Valores constantes", help="Ajusta todos los montos por inflación (IPC)"):
+                    bases = meses_base(ipc)
+                    mes_base = st.selectbox("Pesos de:", options=bases, index=len(bases)-1,
+                                            format_func=convertir_fecha_español)
+            else:
+                st.caption("El ajuste por inflación estará disponible cuando tu contador cargue el IPC.")
+        
+        df_completo = cargar_datos_cliente(archivo_cliente, version, mes_base, version_ipc())
         
         if df_completo is not None:
-            # Convertir fechas al español
-            df_completo['Mes'] = df_completo['Mes'].apply(convertir_fecha_español)
-            
             # Filtros en sidebar
             with st.sidebar:
                 st.divider()
-                st.markdown("#### 📅 Filtrar Período")
-                meses_disponibles = df_completo['Mes'].tolist()
-                
-                mes_desde = st.selectbox("Desde:", options=meses_disponibles, index=0)
-                mes_hasta = st.selectbox("Hasta:", options=meses_disponibles, index=len(meses_disponibles)-1)
-                
-                idx_desde = meses_disponibles.index(mes_desde)
-                idx_hasta = meses_disponibles.index(mes_hasta)
-                
-                if idx_desde > idx_hasta:
-                    st.error("⚠️ 'Desde' debe ser anterior a 'Hasta'")
-                    df = df_completo
-                else:
-                    df = df_completo.iloc[idx_desde:idx_hasta+1].copy()
+                df, idx_desde, idx_hasta = filtro_periodo(df_completo)
                 
-                st.info(f"📊 Mostrando **{len(df)} meses**")
+                st.divider()
+                st.markdown("#### 🔮 Proyección")
+                horizonte = st.slider("Meses a proyectar:", min_value=0, max_value=HORIZONTE_MAX, value=3,
+                                      help="0 para ocultar la proyección")
+            
+            # La proyección solo se dibuja si el período llega hasta el último mes
+            proyeccion = None
+            if horizonte > 0 and idx_hasta == len(df_completo) - 1:
+                proyeccion = proyectar_cliente(archivo_cliente, version, horizonte, mes_base, version_ipc())
             
-            # Alertas
-            alertas = generar_alertas(df)
+            # Alertas precalculadas, solo las de los meses visibles
+            meses_visibles = set(df['Mes'])
+            alertas = [
+                alerta for alerta in obtener_alertas(codigo_cliente, archivo_cliente, version)
+                if convertir_fecha_español(alerta['mes']) in meses_visibles
+            ]
             if alertas:
                 for alerta in alertas:
                     if alerta['tipo'] == 'warning':
@@ -309,240 +790,133 @@ else:
                         st.success(f"**{alerta['titulo']}**  \n{alerta['mensaje']}")
             
             # KPIs
-            st.markdown("### 📈 Indicadores Principales")
-            col1, col2, col3, col4, col5 = st.columns(5)
-            
-            ventas_total = df['Ventas'].sum()
-            ventas_promedio = df['Ventas'].mean()
-            compras_total = df['Total Compras'].sum()
-            sueldos_total = df['Sueldos y CS'].sum()
-            margen_bruto_total = df['Margen Bruto'].sum()
-            margen_bruto_pct = (margen_bruto_total / ventas_total * 100)
-            margen_operativo_total = df['Margen Operativo'].sum()
-            margen_operativo_pct = (margen_operativo_total / ventas_total * 100)
-            ratio_sueldos_ventas = (sueldos_total / ventas_total * 100)
-            
-            with col1:
-                st.metric("Ventas Totales", formatear_monto(ventas_total), 
-                         delta=f"Prom: {formatear_monto(ventas_promedio)}")
-            with col2:
-                st.metric("Compras Totales", formatear_monto(compras_total))
-            with col3:
-                st.metric("Margen Bruto", formatear_monto(margen_bruto_total),
-                         delta=f"{margen_bruto_pct:.1f}%")
-            with col4:
-                color = "normal" if margen_operativo_total >= 0 else "inverse"
-                st.metric("Margen Operativo", formatear_monto(margen_operativo_total),
-                         delta=f"{margen_operativo_pct:.1f}%", delta_color=color)
-            with col5:
-                st.metric("Sueldos / Ventas", f"{ratio_sueldos_ventas:.1f}%")
+            nota = None
+            if mes_base:
+                nota = f"💲 Montos en pesos constantes de {convertir_fecha_español(mes_base)} (ajustados por IPC)"
+            mostrar_kpis(df, "📈 Indicadores Principales", nota)
+            if mes_base:
+                sin_ipc = meses_sin_ipc(procesar_excel(archivo_cliente, version), ipc)
+                if sin_ipc:
+                    st.warning(f"Sin IPC para: {', '.join(convertir_fecha_español(m) for m in sin_ipc)}. "
+                               "Esos meses quedan sin valor.")
             
             st.divider()
             
             # TABS
-            tab1, tab2, tab3, tab4 = st.tabs(["💰 Ventas y Compras", "🧑‍💼 Sueldos", "💹 Rentabilidad", "📋 Resumen Ejecutivo"])
+            tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["💰 Ventas y Compras", "🧑‍💼 Sueldos", "💹 Rentabilidad",
+                                                                "📆 Tendencias", "📋 Resumen Ejecutivo",
+                                                                "🏁 Comparación con Pares", "🔎 Por Período"])
             
             with tab1:
-                st.markdown("### Ventas y Compras")
-                col_izq, col_der = st.columns(2)
-                
-                with col_izq:
-                    st.markdown("#### Evolución de Ventas")
-                    promedio_ventas = df['Ventas'].mean()
-                    
-                    fig = go.Figure()
-                    fig.add_trace(go.Scatter(
-                        x=df['Mes'], y=df['Ventas'],
-                        mode='lines+markers',
-                        name='Ventas',
-                        line=dict(color='#0066cc', width=3),
-                        marker=dict(size=8)
-                    ))
-                    fig.add_trace(go.Scatter(
-                        x=df['Mes'], y=[promedio_ventas]*len(df),
-                        mode='lines',
-                        name='Promedio',
-                        line=dict(color='red', width=2, dash='dash')
-                    ))
-                    fig.update_layout(height=350, hovermode='x unified')
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                with col_der:
-                    st.markdown("#### Evolución de Compras")
-                    fig = go.Figure()
-                    fig.add_trace(go.Scatter(
-                        x=df['Mes'], y=df['Compras CF'],
-                        mode='lines+markers',
-                        name='Compras CF',
-                        line=dict(color='green', width=2),
-                        stackgroup='one'
-                    ))
-                    fig.add_trace(go.Scatter(
-                        x=df['Mes'], y=df['Compras Exentas'],
-                        mode='lines+markers',
-                        name='Compras Exentas',
-                        line=dict(color='orange', width=2),
-                        stackgroup='one'
-                    ))
-                    fig.update_layout(height=350, hovermode='x unified')
-                    st.plotly_chart(fig, use_container_width=True)
+                seccion_ventas_compras(df, "Ventas y Compras", proyeccion)
             
             with tab2:
-                st.markdown("### Sueldos")
-                
-                st.markdown("#### Sueldos como % de Ventas")
-                df['% Sueldos/Ventas'] = (df['Sueldos y CS'] / df['Ventas'] * 100).round(1)
-                
-                fig = go.Figure()
-                fig.add_trace(go.Bar(
-                    x=df['Mes'], y=df['% Sueldos/Ventas'],
-                    marker_color='#3498db',
-                    text=df['% Sueldos/Ventas'].apply(lambda x: f"{x:.1f}%"),
-                    textposition='outside',
-                    textfont=dict(size=12)
-                ))
-                fig.add_hline(y=df['% Sueldos/Ventas'].mean(), 
-                            line_dash="dash", 
-                            line_color="red",
-                            annotation_text="Promedio",
-                            annotation_position="right")
-                fig.update_layout(
-                    height=400,
-                    yaxis_title="Porcentaje (%)",
-                    showlegend=False,
-                    yaxis=dict(range=[0, df['% Sueldos/Ventas'].max() * 1.2])
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                seccion_sueldos(df, "Sueldos")
             
             with tab3:
-                st.markdown("### Rentabilidad")
-                col_izq, col_der = st.columns(2)
+                seccion_rentabilidad(df, "Rentabilidad", proyeccion)
+            
+            with tab4:
+                # Los gráficos de esta pestaña se cachean en disco por datos, período y ventana
+                seccion_tendencias(df, "Tendencias", (hash_contenido(archivo_cliente, version), mes_base,
+                                                      version_ipc(), idx_desde, idx_hasta))
+            
+            with tab5:
+                seccion_resumen(df, "Resumen Ejecutivo")
+            
+            with tab6:
+                st.markdown("### Comparación con Pares")
+                st.markdown("Tu posición frente a empresas similares, sobre los últimos 12 meses. "
+                            "Los datos de los demás clientes son anónimos.")
                 
-                with col_izq:
-                    st.markdown("#### Margen Operativo")
-                    promedio_margen = df['Margen Operativo'].mean()
-                    colores = ['green' if x > 0 else 'red' for x in df['Margen Operativo']]
-                    
-                    fig = go.Figure()
-                    fig.add_trace(go.Bar(
-                        x=df['Mes'], y=df['Margen Operativo'],
-                        marker_color=colores,
-                        name='Margen Operativo'
-                    ))
-                    fig.add_trace(go.Scatter(
-                        x=df['Mes'], y=[promedio_margen]*len(df),
-                        mode='lines',
-                        name='Promedio',
-                        line=dict(color='blue', width=2, dash='dash')
-                    ))
-                    fig.add_hline(y=0, line_dash="solid", line_color="black", line_width=1)
-                    fig.update_layout(height=350, hovermode='x unified')
-                    st.plotly_chart(fig, use_container_width=True)
+                # Resultado precalculado por el panel admin en cada carga de datos
+                posicion = posicion_cliente(cargar_benchmark(), codigo_cliente)
                 
-                with col_der:
-                    st.markdown("#### Evolución de Márgenes (%)")
+                if posicion:
+                    nombres_grupo = {'sector': "tu sector", 'tamano': "empresas de tu tamaño", 'todos': "todos los clientes"}
+                    cols = st.columns(len(posicion))
+                    for col, fila in zip(cols, posicion):
+                        with col:
+                            st.metric(fila['titulo'], formatear_porcentaje(fila['valor']),
+                                      delta=f"Mediana: {formatear_porcentaje(fila['mediana'])}", delta_color="off")
+                            if fila['percentil'] is not None:
+                                st.caption(f"Percentil {fila['percentil']:.0f} entre {nombres_grupo[fila['agrupacion']]} "
+                                           f"({fila['n']} empresas)")
+                    
+                    st.markdown("#### Rango de tus pares (cuartiles)")
                     fig = go.Figure()
-                    fig.add_trace(go.Scatter(
-                        x=df['Mes'], y=df['% Margen Bruto'],
-                        mode='lines+markers',
-                        name='% Margen Bruto',
-                        line=dict(color='blue', width=2)
-                    ))
-                    fig.add_trace(go.Scatter(
-                        x=df['Mes'], y=df['% Margen Operativo'],
-                        mode='lines+markers',
-                        name='% Margen Operativo',
-                        line=dict(color='green', width=2)
-                    ))
-                    fig.update_layout(height=350, hovermode='x unified')
+                    for fila in posicion:
+                        if fila['q1'] is None:
+                            continue
+                        fig.add_trace(go.Bar(
+                            y=[fila['titulo']], x=[fila['q3'] - fila['q1']], base=[fila['q1']],
+                            orientation='h', marker_color='lightgray', showlegend=False,
+                            hovertemplate=f"Q1: {fila['q1']:.1f}% • Q3: {fila['q3']:.1f}%<extra></extra>"
+                        ))
+                        if fila['valor'] is not None:
+                            fig.add_trace(go.Scatter(
+                                y=[fila['titulo']], x=[fila['valor']], mode='markers',
+                                marker=dict(color='#0066cc', size=14, symbol='diamond'),
+                                name='Tu empresa', showlegend=False
+                            ))
+                    fig.update_layout(height=300, xaxis_title="Porcentaje (%)", barmode='overlay')
                     st.plotly_chart(fig, use_container_width=True)
+                    st.caption("Barra gris: rango entre el cuartil 1 y el 3 de tus pares • 🔷 Tu empresa. "
+                               "En Sueldos / Ventas, un valor menor es mejor.")
+                else:
+                    st.info("📭 Todavía no hay suficientes empresas comparables para mostrar esta sección")
             
-            with tab4:
-                st.markdown("### Resumen Ejecutivo")
+            with tab7:
+                st.markdown("### Por Período")
+                granularidad_original, agregados = cargar_agregados(archivo_cliente, version, mes_base, version_ipc())
+                niveles = niveles_disponibles(granularidad_original)
+                col_nivel, col_metodo = st.columns([3, 2])
+                with col_nivel:
+                    nivel = st.radio("Ver por:", options=niveles, index=niveles.index('mensual'),
+                                     format_func=lambda n: NOMBRES_NIVEL[n], horizontal=True)
                 
-                # Tabla de datos
-                st.markdown("#### 📊 Datos Completos")
+                # Los agregados ya están calculados; solo se recorta al período elegido
+                vista = filtrar_periodo(agregados[nivel], int(df['Clave Mes'].iloc[0]), int(df['Clave Mes'].iloc[-1]))
                 
-                # Calcular % Sueldos/Ventas si no existe
-                if '% Sueldos/Ventas' not in df.columns:
-                    df['% Sueldos/Ventas'] = (df['Sueldos y CS'] / df['Ventas'] * 100).round(1)
-                
-                # Seleccionar columnas en el orden correcto
-                df_display = df[['Mes', 'Ventas', 'Compras CF', 'Compras Exentas', 'Sueldos y CS',
-                                 'Margen Operativo', '% Margen Operativo', '% Sueldos/Ventas']].copy()
-                
-                # Guardar valores numéricos para usar en iconos
-                valores_margen_op = df_display['% Margen Operativo'].copy()
-                valores_sueldos = df_display['% Sueldos/Ventas'].copy()
-                
-                # Formatear columnas de montos
-                for col in ['Ventas', 'Compras CF', 'Compras Exentas', 'Sueldos y CS', 'Margen Operativo']:
-                    df_display[col] = df_display[col].apply(formatear_monto)
-                
-                # Formatear % Margen Operativo con iconos
-                def formato_margen_icono(val):
-                    if pd.isna(val):
-                        return "N/A"
-                    if val >= 20:
-                        return f"🟢 {val:.1f}%"
-                    elif val >= 10:
-                        return f"🔵 {val:.1f}%"
-                    elif val >= 0:
-                        return f"🟡 {val:.1f}%"
-                    else:
-                        return f"🔴 {val:.1f}%"
-                
-                # Formatear % Sueldos/Ventas con iconos
-                def formato_sueldos_icono(val):
-                    if pd.isna(val):
-                        return "N/A"
-                    if val <= 10:
-                        return f"🟢 {val:.1f}%"
-                    elif val <= 15:
-                        return f"🔵 {val:.1f}%"
-                    elif val <= 20:
-                        return f"🟡 {val:.1f}%"
-                    else:
-                        return f"🔴 {val:.1f}%"
-                
-                df_display['% Margen Operativo'] = valores_margen_op.apply(formato_margen_icono)
-                df_display['% Sueldos/Ventas'] = valores_sueldos.apply(formato_sueldos_icono)
-                
-                st.dataframe(df_display, use_container_width=True, hide_index=True)
-                
-                # Leyenda de colores
-                st.markdown("""
-                **Leyenda:**  
-                🟢 Excelente • 🔵 Bueno • 🟡 Aceptable • 🔴 Requiere atención
-                """)
-                
-                # Resumen de mejores y peores meses
-                st.divider()
-                st.markdown("#### 📈 Análisis de Períodos")
-                
-                col1, col2, col3 = st.columns(3)
-                
-                mejor_mes_ventas = df.loc[df['Ventas'].idxmax()]
-                peor_mes_ventas = df.loc[df['Ventas'].idxmin()]
-                mejor_margen = df.loc[df['Margen Operativo'].idxmax()]
-                peor_margen = df.loc[df['Margen Operativo'].idxmin()]
-                mejor_sueldo_eficiencia = df.loc[df['% Sueldos/Ventas'].idxmin()]
-                peor_sueldo_eficiencia = df.loc[df['% Sueldos/Ventas'].idxmax()]
-                
-                with col1:
-                    st.markdown("##### 🎯 Ventas")
-                    st.success(f"**✅ Mejor:** {mejor_mes_ventas['Mes']}  \n{formatear_monto(mejor_mes_ventas['Ventas'])}")
-                    st.warning(f"**⚠️ Menor:** {peor_mes_ventas['Mes']}  \n{formatear_monto(peor_mes_ventas['Ventas'])}")
-                
-                with col2:
-                    st.markdown("##### 💹 Rentabilidad")
-                    st.success(f"**✅ Mejor:** {mejor_margen['Mes']}  \n{formatear_monto(mejor_margen['Margen Operativo'])}")
-                    st.warning(f"**⚠️ Menor:** {peor_margen['Mes']}  \n{formatear_monto(peor_margen['Margen Operativo'])}")
+                if not len(vista):
+                    st.info("📭 No hay datos en el período elegido")
+                elif nivel in ('diaria', 'semanal'):
+                    # Muchos puntos: se reducen en el servidor, uno por píxel (el gráfico ocupa todo el ancho)
+                    puntos = puntos_por_trazo(1.0)
+                    with col_metodo:
+                        metodo = st.radio("Reducción:", options=list(METODOS_REDUCCION),
+                                          format_func=METODOS_REDUCCION.get, horizontal=True,
+                                          disabled=len(vista) <= puntos)
+                    fig = go.Figure()
+                    mostrados = 0
+                    for concepto, color in (('Ventas', '#0066cc'), ('Margen Operativo', 'green')):
+                        x, y = reducir(vista['Inicio'].to_numpy(), vista[concepto].to_numpy(), puntos, metodo)
+                        mostrados = max(mostrados, len(x))
+                        fig.add_trace(go.Scattergl(x=x, y=y, mode='lines', name=concepto,
+                                                   line=dict(color=color, width=1.5)))
+                    fig.update_layout(height=400, hovermode='x unified')
+                    st.plotly_chart(fig, use_container_width=True)
+                    if len(vista) > puntos:
+                        st.caption(f"Se muestran hasta {mostrados:,} de {len(vista):,} puntos por serie "
+                                   f"({METODOS_REDUCCION[metodo]}). Acotá el período para ver más detalle.")
+                else:
+                    fig = go.Figure()
+                    fig.add_trace(go.Bar(x=vista['Periodo'], y=vista['Ventas'], name='Ventas', marker_color='#0066cc'))
+                    fig.add_trace(go.Bar(x=vista['Periodo'], y=vista['Margen Operativo'], name='Margen Operativo',
+                                         marker_color='green'))
+                    fig.update_layout(height=400, hovermode='x unified', barmode='group')
+                    st.plotly_chart(fig, use_container_width=True)
                 
-                with col3:
-                    st.markdown("##### 💡 Eficiencia Sueldos")
-                    st.success(f"**✅ Más eficiente:** {mejor_sueldo_eficiencia['Mes']}  \n{mejor_sueldo_eficiencia['% Sueldos/Ventas']:.1f}%")
-                    st.warning(f"**⚠️ Menos eficiente:** {peor_sueldo_eficiencia['Mes']}  \n{peor_sueldo_eficiencia['% Sueldos/Ventas']:.1f}%")
+                if 0 < len(vista) <= 400:
+                    columnas = ['Periodo', 'Ventas', 'Total Compras', 'Sueldos y CS', 'Margen Operativo',
+                                '% Margen Operativo', 'Registros']
+                    formatos = {col: formatear_monto for col in ['Ventas', 'Total Compras', 'Sueldos y CS',
+                                                                 'Margen Operativo']}
+                    formatos.update({'% Margen Operativo': formatear_porcentaje, 'Registros': "{:.0f}"})
+                    st.dataframe(vista[columnas].style.format(formatos), use_container_width=True, hide_index=True)
+                    if (vista['Clave Desde'].iloc[0] < df['Clave Mes'].iloc[0]
+                            or vista['Clave Hasta'].iloc[-1] > df['Clave Mes'].iloc[-1]):
+                        st.caption("El primer o el último período incluye meses fuera del filtro: se muestra completo.")
     
     else:
         st.info("📁 Aún no hay datos disponibles")
@@ -561,5 +935,4 @@ else:
         """)
 
 # Footer
-st.divider()
-st.caption("Dashboard Contable Profesional • Gestión Financiera Empresarial")
+pie_de_pagina()
@@ -0,0 +1,49 @@
+"""Representación compacta del dataset de un cliente, compartida entre sesiones.
+
+El dashboard guarda un único DataFrame por versión de datos, compartido por
+todas las sesiones (``st.cache_resource``), y cada sesión trabaja con vistas
+(``iloc``) sin copiarlo. Para que ocupe poco:
+
+- ``Clave Mes`` es un entero (año * 12 + mes - 1) y ``Mes`` una categoría
+  ordenada con las etiquetas en español, en lugar de strings de Python.
+- Porcentajes y ratios van en float32 (sobran 7 dígitos significativos);
+  los montos quedan en float64 porque se suman para los KPIs.
+"""
+import numpy as np
+import pandas as pd
+
+from procesamiento import convertir_fecha_español
+
+MONTOS = ['Ventas', 'Compras CF', 'Compras Exentas', 'Sueldos y CS', 'Margen Operativo',
+          'Total Compras', 'Margen Bruto']
+
+
+def _es_monto(columna):
+    return columna in MONTOS or any(columna.startswith(f"{m} ") for m in MONTOS)
+
+
+def compactar(df):
+    """Devuelve el DataFrame (con Mes en YYYY-MM) en tipos compactos.
+
+    El resultado se comparte entre sesiones: nadie lo debe modificar.
+    """
+    anio = df['Mes'].str[:4].astype(np.int32)
+    mes = df['Mes'].str[5:7].astype(np.int32)
+    etiquetas = [convertir_fecha_español(m) for m in df['Mes']]
+
+    compacto = pd.DataFrame({
+        'Clave Mes': (anio * 12 + mes - 1).to_numpy(),
+        'Mes': pd.Categorical(etiquetas, categories=list(dict.fromkeys(etiquetas)), ordered=True),
+    })
+    for columna in df.columns:
+        if columna == 'Mes':
+            continue
+        tipo = np.float64 if _es_monto(columna) else np.float32
+        compacto[columna] = df[columna].to_numpy(dtype=tipo)
+
+    return compacto
+
+
+def memoria(df):
+    """Bytes que ocupa el DataFrame (incluidos los objetos de Python)"""
+    return int(df.memory_usage(deep=True).sum())
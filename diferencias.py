@@ -0,0 +1,64 @@
+"""Diferencias mes a mes entre un Excel subido y la versión vigente del cliente.
+
+La comparación se hace en bloque: las dos series se alinean por la clave del
+mes (YYYY-MM) con un solo cruce y las diferencias por concepto salen de restar
+las columnas, sin recorrer meses. El resultado alimenta el preview del panel
+admin y dice qué meses hay que recalcular al confirmar la carga.
+"""
+import numpy as np
+import pandas as pd
+
+from procesamiento import CONCEPTOS
+
+# Diferencias menores a medio centavo se consideran iguales (redondeos del Excel)
+TOLERANCIA = 0.005
+
+ESTADOS = ['Nuevo', 'Revisado', 'Eliminado', 'Sin cambios']
+
+
+def comparar(nuevo, actual=None):
+    """Compara dos DataFrames de leer_excel mes a mes.
+
+    Devuelve un DataFrame con Mes, Estado y, por concepto, el valor nuevo, el
+    anterior y la diferencia (columnas ``{c}``, ``{c} anterior`` y ``Δ {c}``).
+    Sin versión vigente, todos los meses son nuevos.
+    """
+    if actual is None:
+        actual = pd.DataFrame({'Mes': pd.Series(dtype=str), **{c: pd.Series(dtype=float) for c in CONCEPTOS}})
+
+    cruce = pd.merge(
+        nuevo[['Mes'] + CONCEPTOS], actual[['Mes'] + CONCEPTOS],
+        on='Mes', how='outer', suffixes=('', ' anterior'), indicator=True, sort=True
+    )
+
+    valores_nuevos = cruce[CONCEPTOS].to_numpy(dtype=float)
+    valores_previos = cruce[[f"{c} anterior" for c in CONCEPTOS]].to_numpy(dtype=float)
+    deltas = valores_nuevos - valores_previos
+
+    # Un concepto cambió si la diferencia supera la tolerancia o si pasó de vacío a informado (o al revés)
+    cambio = (np.abs(np.nan_to_num(deltas)) > TOLERANCIA) | (np.isnan(valores_nuevos) != np.isnan(valores_previos))
+    lado = cruce.pop('_merge').to_numpy()
+    estado = np.select(
+        [lado == 'left_only', lado == 'right_only', cambio.any(axis=1)],
+        ['Nuevo', 'Eliminado', 'Revisado'],
+        default='Sin cambios'
+    )
+
+    resultado = pd.DataFrame({'Mes': cruce['Mes'], 'Estado': estado})
+    for k, concepto in enumerate(CONCEPTOS):
+        resultado[concepto] = valores_nuevos[:, k]
+        resultado[f"{concepto} anterior"] = valores_previos[:, k]
+        resultado[f"Δ {concepto}"] = np.where(lado == 'both', deltas[:, k], np.nan)
+    return resultado
+
+
+def resumen(diferencias):
+    """Cantidad de meses por estado"""
+    cantidades = diferencias['Estado'].value_counts()
+    return {estado: int(cantidades.get(estado, 0)) for estado in ESTADOS}
+
+
+def meses_afectados(diferencias):
+    """Meses nuevos, revisados o eliminados (los que hay que recalcular), ordenados"""
+    return diferencias.loc[diferencias['Estado'] != 'Sin cambios', 'Mes'].tolist()
+
@@ -0,0 +1,230 @@
+"""Carga masiva de documentos: un ZIP o muchos PDFs repartidos entre clientes.
+
+Cada PDF se asigna a un cliente, en este orden:
+
+1. por el archivo de mapeo (``mapeo.csv`` dentro del ZIP o subido aparte),
+   con columnas ``archivo`` y ``cliente`` (código o CUIT);
+2. por un CUIT en el nombre (11 dígitos, con o sin guiones) que coincida con
+   el ``cuit`` de un cliente en clientes.json;
+3. por el código del cliente dentro del nombre (gana el código más largo).
+
+El tipo se clasifica con las mismas reglas que el dashboard
+(``clasificar_documento``). Los archivos se escriben en paralelo, cada uno en
+un temporal de la misma carpeta que después se renombra (``os.replace``), así
+que nunca queda un PDF a medio escribir. También se puede usar por consola:
+
+    python documentos_masivos.py constancias_febrero.zip
+"""
+import argparse
+import csv
+import io
+import os
+import re
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from procesamiento import DATOS_DIR, cargar_clientes, clasificar_documento
+
+NOMBRES_MAPEO = {'mapeo.csv', 'mapping.csv'}
+
+# Tamaño máximo de cada PDF (también dentro del ZIP, antes de descomprimirlo)
+MAX_BYTES = 50 * 1024 * 1024
+
+HILOS = 8
+
+_CUIT = re.compile(r'(?<!\d)(\d{2})-?(\d{8})-?(\d)(?!\d)')
+
+
+def normalizar_cuit(texto):
+    """Solo los dígitos del CUIT"""
+    return re.sub(r'\D', '', str(texto))
+
+
+def leer_mapeo(datos):
+    """{nombre de archivo: código o CUIT} a partir del CSV (bytes) de mapeo"""
+    texto = datos.decode('utf-8-sig')
+    lector = csv.DictReader(io.StringIO(texto), delimiter=';' if texto.count(';') > texto.count(',') else ',')
+    mapeo = {}
+    for fila in lector:
+        fila = {str(k).strip().lower(): (v or '').strip() for k, v in fila.items() if k}
+        if fila.get('archivo') and fila.get('cliente'):
+            mapeo[Path(fila['archivo']).name] = fila['cliente']
+    return mapeo
+
+
+def expandir(archivos):
+    """Separa los PDFs y el mapeo de una lista de (nombre, bytes), abriendo los ZIP.
+
+    Devuelve (pdfs, mapeo, rechazados): los PDFs como (nombre, bytes), el
+    mapeo combinado y los archivos que no se pueden procesar con su motivo.
+    """
+    pdfs, mapeo, rechazados = [], {}, []
+    for nombre, datos in archivos:
+        nombre = Path(nombre).name
+        extension = Path(nombre).suffix.lower()
+        if nombre.lower() in NOMBRES_MAPEO:
+            mapeo.update(leer_mapeo(datos))
+        elif extension == '.pdf':
+            if len(datos) > MAX_BYTES:
+                rechazados.append((nombre, "Supera el tamaño máximo"))
+            else:
+                pdfs.append((nombre, datos))
+        elif extension == '.zip':
+            try:
+                with zipfile.ZipFile(io.BytesIO(datos)) as zf:
+                    for info in zf.infolist():
+                        # Solo el nombre: nunca se respetan carpetas ni rutas del ZIP
+                        interno = Path(info.filename).name
+                        if info.is_dir() or not interno or info.filename.startswith('__MACOSX'):
+                            continue
+                        if interno.lower() in NOMBRES_MAPEO:
+                            mapeo.update(leer_mapeo(zf.read(info)))
+                        elif Path(interno).suffix.lower() != '.pdf':
+                            rechazados.append((interno, "No es un PDF"))
+                        elif info.file_size > MAX_BYTES:
+                            rechazados.append((interno, "Supera el tamaño máximo"))
+                        else:
+                            pdfs.append((interno, zf.read(info)))
+            except zipfile.BadZipFile:
+                rechazados.append((nombre, "ZIP dañado"))
+        else:
+            rechazados.append((nombre, "No es un PDF ni un ZIP"))
+    return pdfs, mapeo, rechazados
+
+
+def _indice_clientes(config):
+    cuits = {normalizar_cuit(c['cuit']): codigo for codigo, c in config['clientes'].items() if c.get('cuit')}
+    # Los códigos más largos primero: "supply_petrolero_srl" antes que "supply"
+    codigos = sorted(config['clientes'], key=len, reverse=True)
+    return cuits, codigos
+
+
+def rutear(nombre, config, mapeo=None, indice=None):
+    """(código de cliente, criterio) para un archivo, o (None, motivo) si no se puede asignar"""
+    cuits, codigos = indice or _indice_clientes(config)
+    mapeo = mapeo or {}
+
+    if nombre in mapeo:
+        destino = mapeo[nombre]
+        if destino in config['clientes']:
+            return destino, "Mapeo"
+        if normalizar_cuit(destino) in cuits:
+            return cuits[normalizar_cuit(destino)], "Mapeo (CUIT)"
+        return None, f"El mapeo apunta a un cliente inexistente: {destino}"
+
+    encontrados = {cuits[c] for c in (''.join(m) for m in _CUIT.findall(nombre)) if c in cuits}
+    if len(encontrados) == 1:
+        return encontrados.pop(), "CUIT"
+    if len(encontrados) > 1:
+        return None, "El nombre tiene CUITs de más de un cliente"
+
+    base = Path(nombre).stem.lower()
+    for codigo in codigos:
+        if re.search(rf'(?<![a-z0-9]){re.escape(codigo.lower())}(?![a-z0-9])', base):
+            return codigo, "Código"
+    return None, "Sin CUIT ni código de cliente en el nombre"
+
+
+def planificar(archivos, config, mapeo=None):
+    """Asigna cliente y tipo a cada archivo, sin escribir nada (para el preview).
+
+    ``archivos`` es una lista de (nombre, bytes) con PDFs, ZIPs y/o el CSV de
+    mapeo. Devuelve una fila por PDF (o archivo rechazado) con archivo,
+    cliente, criterio, tipo, bytes y datos; ``cliente`` es None si no se pudo
+    asignar y ``motivo`` explica por qué.
+    """
+    pdfs, mapeo_lote, rechazados = expandir(archivos)
+    mapeo = {**mapeo_lote, **(mapeo or {})}
+    indice = _indice_clientes(config)
+
+    plan = []
+    for nombre, datos in pdfs:
+        codigo, criterio = rutear(nombre, config, mapeo, indice)
+        tipo, _ = clasificar_documento(nombre)
+        plan.append({
+            'archivo': nombre,
+            'cliente': codigo,
+            'criterio': criterio if codigo else None,
+            'motivo': None if codigo else criterio,
+            'tipo': tipo,
+            'bytes': len(datos),
+            'datos': datos,
+        })
+    for nombre, motivo in rechazados:
+        plan.append({'archivo': nombre, 'cliente': None, 'criterio': None, 'motivo': motivo,
+                     'tipo': None, 'bytes': 0, 'datos': None})
+
+    # Dos PDFs con el mismo nombre para el mismo cliente: el segundo pisaría al primero
+    vistos = set()
+    for fila in plan:
+        clave = (fila['cliente'], fila['archivo'].lower())
+        if fila['cliente'] and clave in vistos:
+            fila['cliente'], fila['criterio'], fila['motivo'] = None, None, "Nombre repetido en el lote"
+        vistos.add(clave)
+    return plan
+
+
+def escribir_atomico(destino, datos):
+    """Escribe en un temporal de la misma carpeta y lo renombra sobre el destino"""
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    tmp = destino.with_name(f".{destino.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(datos)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, destino)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def _guardar(fila):
+    resultado = {k: v for k, v in fila.items() if k != 'datos'}
+    if fila['cliente'] is None:
+        resultado.update(estado='error', detalle=fila['motivo'])
+        return resultado
+    destino = DATOS_DIR / fila['cliente'] / "documentos" / fila['archivo']
+    try:
+        reemplaza = destino.exists()
+        escribir_atomico(destino, fila['datos'])
+        resultado.update(estado='ok', detalle="Reemplazó al existente" if reemplaza else "Nuevo")
+    except OSError as e:
+        resultado.update(estado='error', detalle=str(e))
+    return resultado
+
+
+def guardar_lote(plan, hilos=HILOS):
+    """Escribe en paralelo los archivos asignados; devuelve el reporte por archivo"""
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        return list(executor.map(_guardar, plan))
+
+
+def resumen_reporte(reporte):
+    return {
+        'ok': sum(1 for r in reporte if r['estado'] == 'ok'),
+        'error': sum(1 for r in reporte if r['estado'] == 'error'),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reparte un lote de PDFs (o ZIPs) entre los clientes")
+    parser.add_argument('archivos', nargs='+', help="PDFs, ZIPs y/o mapeo.csv")
+    parser.add_argument('--simular', action='store_true', help="Solo mostrar a qué cliente iría cada archivo")
+    parser.add_argument('--hilos', type=int, default=HILOS)
+    args = parser.parse_args()
+
+    config = cargar_clientes()
+    entrada = [(Path(a).name, Path(a).read_bytes()) for a in args.archivos]
+    plan = planificar(entrada, config)
+    reporte = plan if args.simular else guardar_lote(plan, args.hilos)
+    for fila in reporte:
+        estado = fila.get('estado', 'ok' if fila['cliente'] else 'error')
+        detalle = fila.get('detalle') or fila['motivo'] or fila['criterio']
+        print(f"{'✅' if estado == 'ok' else '❌'} {fila['archivo']} → {fila['cliente'] or '-'} "
+              f"({fila['tipo'] or '-'}) • {detalle}")
+    if not args.simular:
+        totales = resumen_reporte(reporte)
+        print(f"{totales['ok']} guardados, {totales['error']} con error")
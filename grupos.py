@@ -0,0 +1,104 @@
+"""Grupos de empresas (holdings): un código de acceso para varios clientes.
+
+Los grupos se definen en la sección ``grupos`` de clientes.json:
+
+    "grupos": {
+        "holding_norte": {"nombre": "Holding Norte", "miembros": ["empresa_a", "empresa_b"],
+                          "activo": true, "fecha_alta": "2025-02-09"}
+    }
+
+La serie consolidada es la suma mes a mes de los conceptos de los miembros,
+en bloque sobre la matriz (concepto, cliente, mes) de analitica, y los ratios
+se recalculan sobre los totales. El resultado se guarda en la caché en disco
+con una clave armada con el hash del Excel vigente de cada miembro: solo se
+recalcula cuando cambia la versión de datos de alguno. Un miembro cuyo Excel
+no se puede leer queda afuera del consolidado y se informa, sin tirar abajo
+la vista del grupo.
+"""
+import numpy as np
+import pandas as pd
+
+from analitica import construir_matriz
+from cache_disco import hash_contenido, obtener_o_calcular
+from metricas import agregar_metricas_temporales
+from procesamiento import CONCEPTOS, agregar_derivados, leer_excel_cacheado, obtener_archivo_cliente, version_datos
+
+# Cambiar si cambia el cálculo: invalida las series consolidadas de la caché en disco
+FORMATO_GRUPO = 2
+
+
+def obtener_grupos(config):
+    return config.get('grupos', {})
+
+
+def archivos_miembros(config, codigo_grupo):
+    """{codigo: Excel vigente} de los miembros activos que tienen datos"""
+    archivos = {}
+    for codigo in obtener_grupos(config)[codigo_grupo]['miembros']:
+        cliente = config['clientes'].get(codigo)
+        if cliente is None or not cliente['activo']:
+            continue
+        archivo = obtener_archivo_cliente(codigo)
+        if archivo is not None:
+            archivos[codigo] = archivo
+    return archivos
+
+
+def versiones_miembros(config, codigo_grupo):
+    """Versión de datos de cada miembro, como tupla ordenada (clave de caché)"""
+    return tuple(sorted((codigo, version_datos(archivo))
+                        for codigo, archivo in archivos_miembros(config, codigo_grupo).items()))
+
+
+def consolidar(frames):
+    """Suma mes a mes los conceptos de {codigo: DataFrame de leer_excel}.
+
+    Devuelve (consolidado, matriz): el DataFrame con los totales, los
+    derivados recalculados y la columna ``Empresas`` (cuántas informaron cada
+    mes), y la matriz por empresa para los gráficos de desglose. Un mes que
+    ninguna empresa informa queda en NaN.
+    """
+    matriz = construir_matriz(frames)
+    informados = ~np.isnan(matriz.valores)
+    totales = np.where(informados.any(axis=1), np.nansum(matriz.valores, axis=1), np.nan)
+
+    consolidado = pd.DataFrame({'Mes': matriz.meses})
+    for k, concepto in enumerate(CONCEPTOS):
+        consolidado[concepto] = totales[k]
+    consolidado = agregar_derivados(consolidado)
+    consolidado['Empresas'] = informados[CONCEPTOS.index('Ventas')].sum(axis=0)
+    return consolidado, matriz
+
+
+def serie_consolidada(config, codigo_grupo):
+    """(consolidado con métricas temporales, matriz por empresa, omitidas) del grupo, cacheado en disco.
+
+    ``omitidas`` es la lista de (código, error) de los miembros cuyo Excel no
+    se pudo leer; si no se pudo leer ninguno, el consolidado y la matriz son
+    None. Devuelve None si ningún miembro tiene datos.
+    """
+    archivos = archivos_miembros(config, codigo_grupo)
+    if not archivos:
+        return None
+
+    def calcular():
+        frames, omitidas = {}, []
+        for codigo, archivo in archivos.items():
+            try:
+                frames[codigo] = leer_excel_cacheado(archivo)
+            except Exception as e:
+                omitidas.append((codigo, str(e)))
+        if not frames:
+            return None, None, omitidas
+        consolidado, matriz = consolidar(frames)
+        return agregar_metricas_temporales(consolidado), matriz, omitidas
+
+    clave = (FORMATO_GRUPO,) + tuple((codigo, hash_contenido(archivos[codigo])) for codigo in sorted(archivos))
+    return obtener_o_calcular('grupo', clave, calcular)
+
+
+def desglose(matriz, concepto, nombres=None):
+    """DataFrame mes × empresa con el ``concepto`` de cada miembro"""
+    nombres = nombres or {}
+    return pd.DataFrame(matriz[concepto].T, index=matriz.meses,
+                        columns=[nombres.get(codigo, codigo) for codigo in matriz.codigos])
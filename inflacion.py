@@ -0,0 +1,118 @@
+"""Ajuste por inflación: lleva los montos a valores constantes de un mes base.
+
+El índice de precios (IPC mensual) se guarda en ``ipc.csv`` con las columnas
+``Mes`` (YYYY-MM) e ``IPC``; se edita desde el panel admin o se trae la serie
+oficial de INDEC (nivel general nacional, base dic. 2016 = 100) desde la API
+de series de datos.gob.ar:
+
+    python inflacion.py --actualizar
+
+El deflactor se aplica con un cruce vectorizado por mes, sin recorrer filas.
+"""
+import argparse
+import json
+import os
+import urllib.request
+from functools import lru_cache
+
+import pandas as pd
+
+from cache_disco import hash_contenido
+from procesamiento import BASE_DIR, CONCEPTOS, agregar_derivados
+
+IPC_FILE = BASE_DIR / "ipc.csv"
+
+# IPC nivel general, total nacional, base diciembre 2016 = 100 (INDEC)
+SERIE_INDEC = "148.3_INIVELNAL_DICI_M_26"
+URL_SERIES = "https://apis.datos.gob.ar/series/api/series/"
+
+
+def version_ipc():
+    """Hash del contenido de la tabla de IPC (clave de caché, también entre procesos)"""
+    if not IPC_FILE.exists():
+        return None
+    return hash_contenido(IPC_FILE)
+
+
+@lru_cache(maxsize=4)
+def _leer_ipc(version):
+    if version is None:
+        return pd.Series(dtype=float)
+    tabla = pd.read_csv(IPC_FILE, dtype={'Mes': str})
+    tabla['IPC'] = pd.to_numeric(tabla['IPC'], errors='coerce')
+    tabla = tabla.dropna().drop_duplicates('Mes', keep='last')
+    return tabla.set_index('Mes')['IPC'].sort_index()
+
+
+def cargar_ipc():
+    """Serie IPC indexada por mes (YYYY-MM); no modificar, es compartida"""
+    return _leer_ipc(version_ipc())
+
+
+def guardar_ipc(tabla):
+    """Guarda la tabla (DataFrame con Mes e IPC) de forma atómica"""
+    tabla = tabla[['Mes', 'IPC']].dropna().copy()
+    tabla['Mes'] = tabla['Mes'].astype(str).str[:7]
+    tabla = tabla.drop_duplicates('Mes', keep='last').sort_values('Mes')
+    tmp = IPC_FILE.with_suffix('.tmp')
+    tabla.to_csv(tmp, index=False)
+    os.replace(tmp, IPC_FILE)
+
+
+def descargar_ipc_indec(timeout=30):
+    """Serie publicada por INDEC como DataFrame con Mes e IPC (necesita acceso a internet)"""
+    url = f"{URL_SERIES}?ids={SERIE_INDEC}&format=json&limit=5000"
+    with urllib.request.urlopen(url, timeout=timeout) as respuesta:
+        datos = json.load(respuesta)
+    tabla = pd.DataFrame(datos['data'], columns=['Mes', 'IPC'])
+    tabla['Mes'] = tabla['Mes'].astype(str).str[:7]
+    return tabla.dropna()
+
+
+def actualizar_ipc_indec():
+    """Reemplaza la tabla por la serie oficial (no se mezcla con índices de otra base).
+
+    Devuelve la cantidad de meses guardados.
+    """
+    tabla = descargar_ipc_indec()
+    guardar_ipc(tabla)
+    return len(tabla)
+
+
+def meses_base(ipc=None):
+    """Meses que se pueden elegir como base (los que tienen IPC)"""
+    ipc = cargar_ipc() if ipc is None else ipc
+    return list(ipc.index)
+
+
+def meses_sin_ipc(df, ipc=None):
+    ipc = cargar_ipc() if ipc is None else ipc
+    return sorted(set(df['Mes']) - set(ipc.index))
+
+
+def deflactar(df, mes_base, ipc=None):
+    """Devuelve una copia de ``df`` con los montos en pesos constantes de ``mes_base``.
+
+    ``df`` tiene la columna Mes en formato YYYY-MM (el de leer_excel). Los
+    conceptos se multiplican por IPC[base] / IPC[mes] y las columnas derivadas
+    se recalculan; los meses sin IPC quedan en NaN.
+    """
+    ipc = cargar_ipc() if ipc is None else ipc
+    factores = ipc.loc[mes_base] / ipc
+    df = df.copy()
+    df[CONCEPTOS] = df[CONCEPTOS].mul(df['Mes'].map(factores), axis=0)
+    return agregar_derivados(df)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tabla de IPC para el ajuste por inflación")
+    parser.add_argument('--actualizar', action='store_true', help="Traer la serie oficial de INDEC")
+    args = parser.parse_args()
+
+    if args.actualizar:
+        print(f"{actualizar_ipc_indec()} meses guardados en {IPC_FILE}")
+    ipc = cargar_ipc()
+    if len(ipc):
+        print(f"IPC de {ipc.index[0]} a {ipc.index[-1]} ({len(ipc)} meses)")
+    else:
+        print("La tabla de IPC está vacía: python inflacion.py --actualizar")
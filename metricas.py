@@ -0,0 +1,125 @@
+"""Métricas temporales de la serie de un cliente (ventanas móviles e interanuales).
+
+Se calculan una sola vez sobre la serie completa, con operaciones vectorizadas
+de pandas; los filtros de período del dashboard solo recortan el resultado.
+"""
+import pandas as pd
+
+from cache_disco import armar_clave, escribir, hash_contenido, obtener_o_calcular
+from procesamiento import leer_excel_cacheado
+
+VENTANAS = [3, 6, 12]
+
+# Meses previos que necesita el cálculo de un mes (ventana más larga e interanual)
+MESES_CONTEXTO = max(max(VENTANAS), 12)
+
+# Cambiar si cambia el cálculo: invalida las métricas guardadas en la caché en disco
+FORMATO_METRICAS = 1
+
+# Conceptos a los que se les calculan acumulados y promedios móviles
+CONCEPTOS_MOVILES = ['Ventas', 'Margen Operativo']
+
+
+def _dividir(a, b):
+    return (a / b.where(b != 0)) * 100
+
+
+def agregar_metricas_temporales(df):
+    """Agrega al DataFrame de leer_excel las columnas móviles, interanuales y TTM.
+
+    Los meses faltantes se completan con NaN antes de calcular, para que
+    ``shift(12)`` compare siempre contra el mismo mes del año anterior. Las
+    ventanas solo se informan cuando tienen todos sus meses. Lanza ValueError
+    si un mes no es una fecha o aparece más de una vez (no hay un único lugar
+    donde ubicarlo en la serie).
+    """
+    df = df.copy()
+    df['% Sueldos/Ventas'] = (df['Sueldos y CS'] / df['Ventas'] * 100).round(1)
+
+    fechas = pd.to_datetime(df['Mes'].astype(str), format='%Y-%m', errors='coerce')
+    invalidos = df.loc[fechas.isna(), 'Mes']
+    if len(invalidos):
+        raise ValueError("Meses que no son fechas: " + ", ".join(invalidos.astype(str)))
+    periodos = pd.PeriodIndex(fechas.dt.to_period('M'))
+    repetidos = periodos[periodos.duplicated()]
+    if len(repetidos):
+        raise ValueError("Meses repetidos: " + ", ".join(sorted(set(repetidos.astype(str)))))
+    completo = pd.period_range(periodos.min(), periodos.max(), freq='M')
+    serie = df.set_index(periodos).reindex(completo)
+
+    nuevas = {}
+    for concepto in CONCEPTOS_MOVILES:
+        for n in VENTANAS:
+            ventana = serie[concepto].rolling(n, min_periods=n)
+            nuevas[f"{concepto} Acum {n}M"] = ventana.sum()
+            nuevas[f"{concepto} Prom {n}M"] = ventana.mean()
+        nuevas[f"Var. Interanual {concepto} (%)"] = _dividir(
+            serie[concepto] - serie[concepto].shift(12), serie[concepto].shift(12).abs()
+        ).round(2)
+
+    # Márgenes de los últimos doce meses (trailing twelve months)
+    ventas_ttm = nuevas['Ventas Acum 12M']
+    nuevas['% Margen Operativo TTM'] = _dividir(nuevas['Margen Operativo Acum 12M'], ventas_ttm).round(2)
+    margen_bruto_ttm = serie['Margen Bruto'].rolling(12, min_periods=12).sum()
+    nuevas['% Margen Bruto TTM'] = _dividir(margen_bruto_ttm, ventas_ttm).round(2)
+
+    nuevas = pd.DataFrame(nuevas, index=completo).reindex(periodos)
+    return pd.concat([df, nuevas.set_axis(df.index)], axis=1)
+
+
+def _clave_metricas(archivo, version=None):
+    return (hash_contenido(archivo, version), FORMATO_METRICAS)
+
+
+def metricas_cliente(archivo, version=None):
+    """Serie del cliente con las métricas temporales, guardada en la caché en disco"""
+    return obtener_o_calcular('metricas', _clave_metricas(archivo, version),
+                              lambda: agregar_metricas_temporales(leer_excel_cacheado(archivo, version)))
+
+
+def actualizar_metricas_temporales(previo, df, desde):
+    """Recalcula las métricas solo desde el mes ``desde`` (YYYY-MM) en adelante.
+
+    ``previo`` es el resultado de agregar_metricas_temporales para la versión
+    anterior y ``df`` la serie nueva (iguales antes de ``desde``). Se recalcula
+    un tramo con MESES_CONTEXTO meses de contexto y se pega a las filas
+    previas; el resultado es el mismo que recalcular toda la serie.
+    """
+    inicio = str(pd.Period(desde, freq='M') - MESES_CONTEXTO)
+    tramo = agregar_metricas_temporales(df[df['Mes'] >= inicio])
+    return pd.concat([previo[previo['Mes'] < desde], tramo[tramo['Mes'] >= desde]], ignore_index=True)
+
+
+def guardar_metricas_incrementales(archivo_anterior, archivo_nuevo, desde):
+    """Deja en la caché en disco las métricas de la versión nueva recalculando solo desde ``desde``.
+
+    Si las métricas de la versión anterior no están en la caché, se calculan completas.
+    """
+    df = leer_excel_cacheado(archivo_nuevo)
+    previo = metricas_cliente(archivo_anterior)
+    if desde is None:
+        nuevo = previo
+    else:
+        nuevo = actualizar_metricas_temporales(previo, df, desde)
+    escribir(armar_clave('metricas', *_clave_metricas(archivo_nuevo)), 'metricas', nuevo)
+    return nuevo
+
+
+def calcular_kpis(df):
+    """Indicadores principales del período (los de la cabecera del dashboard)"""
+    ventas_total = df['Ventas'].sum()
+    sueldos_total = df['Sueldos y CS'].sum()
+    margen_bruto_total = df['Margen Bruto'].sum()
+    margen_operativo_total = df['Margen Operativo'].sum()
+    return {
+        'meses': len(df),
+        'ventas_total': ventas_total,
+        'ventas_promedio': df['Ventas'].mean(),
+        'compras_total': df['Total Compras'].sum(),
+        'sueldos_total': sueldos_total,
+        'margen_bruto_total': margen_bruto_total,
+        'margen_bruto_pct': margen_bruto_total / ventas_total * 100,
+        'margen_operativo_total': margen_operativo_total,
+        'margen_operativo_pct': margen_operativo_total / ventas_total * 100,
+        'sueldos_ventas_pct': sueldos_total / ventas_total * 100,
+    }
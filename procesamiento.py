@@ -0,0 +1,243 @@
+import json
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from cache_disco import hash_contenido, obtener_o_calcular
+
+# Directorios
+BASE_DIR = Path(__file__).parent
+DATOS_DIR = BASE_DIR / "datos"
+CLIENTES_FILE = BASE_DIR / "clientes.json"
+
+# Conceptos tal como vienen en las filas 3 a 7 del Excel
+CONCEPTOS = ['Ventas', 'Compras CF', 'Compras Exentas', 'Sueldos y CS', 'Margen Operativo']
+
+
+def cargar_clientes():
+    if CLIENTES_FILE.exists():
+        with open(CLIENTES_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {"clientes": {}, "admin": {"codigo": "admin2024", "nombre": "Administrador"}}
+
+
+def _a_fechas(valores):
+    """Fechas de una fila o columna de encabezados; NaT en lo que no es fecha ("Total", notas)"""
+    return pd.Series([
+        pd.Timestamp(v) if isinstance(v, datetime)
+        else pd.NaT if pd.isna(v)
+        else pd.to_datetime(str(v)[:10], errors='coerce')
+        for v in valores
+    ], dtype='datetime64[ns]')
+
+
+def _validar_fechas(detalle):
+    """Rechaza fechas repetidas y, en un Excel mensual, dos columnas del mismo mes"""
+    repetidas = detalle['Fecha'][detalle['Fecha'].duplicated()]
+    if granularidad(detalle) == 'mensual':
+        repetidas = detalle['Fecha'][detalle['Fecha'].dt.to_period('M').duplicated()]
+        if len(repetidas):
+            raise ValueError("Meses repetidos en el Excel: " + ", ".join(sorted(set(repetidas.dt.strftime('%Y-%m')))))
+    if len(repetidas):
+        raise ValueError("Fechas repetidas en el Excel: " + ", ".join(sorted(set(repetidas.dt.strftime('%Y-%m-%d')))))
+
+
+def leer_excel_detalle(archivo):
+    """Lee el Excel con la granularidad original: DataFrame con Fecha y los conceptos.
+
+    ``Fecha`` es la clave de tiempo explícita (datetime), sea un mes, una
+    semana o un día. Acepta el formato de siempre (una columna por período,
+    fechas en la fila 3 y conceptos en las filas 4 a 8) o uno largo, con
+    encabezado ``Fecha`` y los conceptos en la primera fila y una fila por
+    fecha. Las columnas (o filas) cuyo encabezado no es una fecha, como
+    "Total" o notas, se ignoran. Lanza la excepción original si el archivo no
+    tiene el formato esperado, y ValueError si repite fechas (o meses, si es
+    mensual).
+    """
+    hoja = pd.read_excel(archivo, sheet_name=0, header=None)
+    if str(hoja.iloc[0, 0]).strip().lower() == 'fecha':
+        hoja.columns = ['Fecha'] + [str(c).strip() for c in hoja.iloc[0, 1:]]
+        hoja = hoja.iloc[1:]
+        fechas = _a_fechas(hoja['Fecha'])
+        validas = fechas.notna().to_numpy()
+        data = {'Fecha': fechas[validas].to_numpy()}
+        for concepto in CONCEPTOS:
+            data[concepto] = hoja[concepto].values[validas]
+    else:
+        fechas = _a_fechas(hoja.iloc[2, 2:].values)
+        validas = fechas.notna().to_numpy()
+        data = {'Fecha': fechas[validas].to_numpy()}
+        for fila, concepto in enumerate(CONCEPTOS, start=3):
+            data[concepto] = hoja.iloc[fila, 2:].values[validas]
+    detalle = pd.DataFrame(data)
+
+    for col in CONCEPTOS:
+        detalle[col] = pd.to_numeric(detalle[col], errors='coerce')
+
+    detalle = detalle.sort_values('Fecha', kind='stable').reset_index(drop=True)
+    _validar_fechas(detalle)
+    return detalle
+
+
+def granularidad(detalle):
+    """'diaria', 'semanal' o 'mensual' según la separación típica entre fechas"""
+    if len(detalle) < 2:
+        return 'mensual'
+    dias = detalle['Fecha'].diff().dt.days.median()
+    if dias <= 1.5:
+        return 'diaria'
+    if dias <= 8:
+        return 'semanal'
+    return 'mensual'
+
+
+def a_meses(detalle):
+    """Suma el detalle por mes: DataFrame con Mes (YYYY-MM) y los conceptos"""
+    meses = detalle['Fecha'].dt.strftime('%Y-%m')
+    mensual = detalle.groupby(meses)[CONCEPTOS].sum(min_count=1)
+    return mensual.rename_axis('Mes').reset_index()
+
+
+def leer_excel(archivo):
+    """Lee el Excel del cliente y devuelve la serie mensual limpia con los derivados.
+
+    Si el Excel viene por semana o por día, los conceptos se suman por mes:
+    el resto del sistema (métricas, benchmark, alertas) trabaja en meses. Un
+    Excel mensual nunca llega a sumar: un mes repetido se rechaza al leerlo.
+    Lanza la excepción original si el archivo no tiene el formato esperado.
+    """
+    return agregar_derivados(a_meses(leer_excel_detalle(archivo)))
+
+
+def agregar_derivados(df):
+    """Calcula (o recalcula) las columnas derivadas a partir de los conceptos"""
+    df['Total Compras'] = df['Compras CF'] + df['Compras Exentas']
+    df['Margen Bruto'] = df['Ventas'] - df['Total Compras']
+    df['% Margen Bruto'] = (df['Margen Bruto'] / df['Ventas'] * 100).round(2)
+    df['% Margen Operativo'] = (df['Margen Operativo'] / df['Ventas'] * 100).round(2)
+    df['Ratio Ventas/Sueldos'] = (df['Ventas'] / df['Sueldos y CS']).round(2)
+    return df
+
+
+def formatear_monto(valor):
+    if pd.isna(valor):
+        return "N/A"
+    return f"${valor/1_000_000:,.1f}M"
+
+
+def formatear_porcentaje(valor):
+    if pd.isna(valor):
+        return "N/A"
+    return f"{valor:.1f}%"
+
+
+def convertir_fecha_español(fecha_str):
+    """Convierte formato YYYY-MM a Mes YYYY en español"""
+    meses_es = {
+        '01': 'Ene', '02': 'Feb', '03': 'Mar', '04': 'Abr',
+        '05': 'May', '06': 'Jun', '07': 'Jul', '08': 'Ago',
+        '09': 'Sep', '10': 'Oct', '11': 'Nov', '12': 'Dic'
+    }
+    try:
+        year, month = fecha_str.split('-')
+        return f"{meses_es[month]} {year}"
+    except:
+        return fecha_str
+
+
+def _orden_version(archivo):
+    """Los datos_AAAAMMDD_HHMMSS van por la fecha del nombre y siempre después
+    de cualquier otro Excel (copiado a mano), que solo ordena por modificación"""
+    try:
+        return (1, datetime.strptime(archivo.stem.replace('datos_', '', 1), '%Y%m%d_%H%M%S'))
+    except ValueError:
+        return (0, datetime.fromtimestamp(archivo.stat().st_mtime))
+
+
+def listar_versiones(codigo_cliente):
+    """Excels guardados del cliente, del más viejo al vigente.
+
+    Vigente es el último ``datos_<timestamp>.xlsx`` guardado desde el panel; un
+    Excel con otro nombre solo se usa si el cliente no tiene ninguno de esos.
+    """
+    cliente_dir = DATOS_DIR / codigo_cliente
+    if cliente_dir.exists():
+        return sorted(cliente_dir.glob("*.xlsx"), key=_orden_version)
+    return []
+
+
+def obtener_archivo_cliente(codigo_cliente):
+    """Devuelve el Excel vigente del cliente (el último guardado)"""
+    archivos = listar_versiones(codigo_cliente)
+    if archivos:
+        return archivos[-1]
+    return None
+
+
+def version_datos(archivo):
+    """Identifica la versión de un archivo de datos (nombre, tamaño y fecha de modificación).
+
+    Sirve como clave de caché: cambia cada vez que se guarda un Excel nuevo.
+    """
+    if archivo is None:
+        return None
+    stat = Path(archivo).stat()
+    return f"{Path(archivo).name}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def clasificar_documento(nombre_archivo):
+    """Tipo e ícono de un documento según su nombre: (tipo, icono)"""
+    nombre = Path(nombre_archivo).stem.lower()
+    if 'arca' in nombre or 'arba' in nombre:
+        return "Constancia ARCA", "📄"
+    if 'pyme' in nombre:
+        return "Certificado PyME", "🏭"
+    if 'reporte' in nombre or 'informe' in nombre:
+        return "Reporte Mensual", "📊"
+    return "Documento", "📎"
+
+
+def obtener_documentos_cliente(codigo_cliente):
+    """Obtiene lista de PDFs disponibles para el cliente"""
+    cliente_dir = DATOS_DIR / codigo_cliente / "documentos"
+    documentos = []
+
+    if cliente_dir.exists():
+        # Buscar PDFs
+        pdfs = list(cliente_dir.glob("*.pdf"))
+        for pdf in pdfs:
+            tipo, icono = clasificar_documento(pdf.name)
+            documentos.append({
+                'nombre': pdf.name,
+                'tipo': tipo,
+                'icono': icono,
+                'ruta': pdf,
+                'fecha': datetime.fromtimestamp(pdf.stat().st_mtime).strftime('%d/%m/%Y')
+            })
+
+    return sorted(documentos, key=lambda x: x['tipo'])
+
+
+# Cambiar si cambia lo que devuelve leer_excel, para no leer entradas viejas de la caché en disco
+FORMATO_EXCEL = 3
+
+
+@lru_cache(maxsize=64)
+def _leer_excel_version(archivo, version):
+    return obtener_o_calcular('excel', (hash_contenido(archivo, version), FORMATO_EXCEL),
+                              lambda: leer_excel(archivo))
+
+
+def leer_excel_cacheado(archivo, version=None):
+    """leer_excel con caché por versión de datos: en memoria y en disco.
+
+    Es la caché que comparten el dashboard, el panel admin y la API. La caché
+    en disco (cache_disco.py) la comparten además todos los procesos del host
+    y está indexada por el hash del contenido del Excel. El DataFrame devuelto
+    es compartido: quien lo necesite modificar tiene que copiarlo.
+    """
+    if version is None:
+        version = version_datos(archivo)
+    return _leer_excel_version(str(archivo), version)
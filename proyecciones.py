@@ -0,0 +1,140 @@
+"""Proyección de Ventas, Compras y Margen Operativo para los próximos meses.
+
+El ajuste es por mínimos cuadrados sobre la matriz clientes × meses de
+analitica.py: todas las series (concepto × cliente) se ajustan juntas con
+sumas vectorizadas, sin un bucle por cliente. Si una serie tiene al menos dos
+años de datos se le descuenta además un componente estacional por mes.
+"""
+import numpy as np
+import pandas as pd
+
+from analitica import construir_matriz
+
+HORIZONTE_MAX = 12
+
+# Meses más recientes del eje común que entran en el ajuste
+MESES_AJUSTE = 36
+
+# Meses con dato necesarios para estimar la estacionalidad
+MIN_MESES_ESTACIONAL = 24
+
+# Meses con dato necesarios para proyectar una serie
+MIN_MESES_PROYECCION = 4
+
+# Banda de confianza del 80% (z de una normal)
+Z_BANDA = 1.2816
+
+CONCEPTOS_PROYECCION = ['Ventas', 'Total Compras', 'Margen Operativo']
+
+
+def _series(matriz):
+    """Matriz (concepto proyectado, cliente, mes)"""
+    return np.stack([
+        matriz['Ventas'],
+        matriz['Compras CF'] + matriz['Compras Exentas'],
+        matriz['Margen Operativo'],
+    ])
+
+
+def _ajuste_lineal(y, pesos, t):
+    """Recta por mínimos cuadrados para cada fila de ``y`` (filas, meses) a la vez"""
+    n = pesos.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_medio = (pesos * t).sum(axis=1) / n
+        y_medio = np.where(pesos, y, 0).sum(axis=1) / n
+        dt = np.where(pesos, t - t_medio[:, None], 0)
+        sxx = (dt ** 2).sum(axis=1)
+        pendiente = (dt * np.where(pesos, y - y_medio[:, None], 0)).sum(axis=1) / sxx
+    ordenada = y_medio - pendiente * t_medio
+    return ordenada, pendiente, n, t_medio, sxx
+
+
+def ajustar_y_proyectar(y, meses, horizonte):
+    """Ajusta todas las filas de ``y`` (filas, meses) y proyecta ``horizonte`` meses.
+
+    Cada fila se proyecta desde su propio último mes con dato. Devuelve
+    (proyección, inferior, superior, último índice con dato, pendiente); las
+    filas con menos de MIN_MESES_PROYECCION meses quedan en NaN.
+    """
+    filas, total_meses = y.shape
+    t = np.arange(total_meses, dtype=float)
+    pesos = ~np.isnan(y) & (t >= total_meses - MESES_AJUSTE)[None, :]
+
+    # Mes del año (0-11) de cada columna, para la estacionalidad
+    mes_anio = np.array([int(m[5:7]) - 1 for m in meses])
+    uno_caliente = np.eye(12)[mes_anio]
+
+    ordenada, pendiente, n, t_medio, sxx = _ajuste_lineal(y, pesos, t)
+
+    # Estacionalidad aditiva: promedio del residuo por mes del año, centrado
+    residuo = np.where(pesos, y - (ordenada[:, None] + pendiente[:, None] * t), 0)
+    cantidad = pesos.astype(float) @ uno_caliente
+    with np.errstate(divide='ignore', invalid='ignore'):
+        estacional = np.where(cantidad >= 2, (residuo @ uno_caliente) / cantidad, 0)
+    estacional -= estacional.mean(axis=1, keepdims=True)
+    estacional[n < MIN_MESES_ESTACIONAL] = 0
+
+    # Reajuste de la tendencia sobre la serie desestacionalizada
+    y_ajustada = y - estacional[:, mes_anio]
+    ordenada, pendiente, n, t_medio, sxx = _ajuste_lineal(y_ajustada, pesos, t)
+    residuo = np.where(pesos, y_ajustada - (ordenada[:, None] + pendiente[:, None] * t), 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma = np.sqrt((residuo ** 2).sum(axis=1) / (n - 2))
+
+    ultimo = total_meses - 1 - np.argmax(pesos[:, ::-1], axis=1)
+    pasos = np.arange(1, horizonte + 1)
+    t_futuro = ultimo[:, None] + pasos[None, :]
+    mes_futuro = (mes_anio[ultimo][:, None] + pasos[None, :]) % 12
+
+    proyeccion = ordenada[:, None] + pendiente[:, None] * t_futuro + np.take_along_axis(estacional, mes_futuro, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ancho = Z_BANDA * sigma[:, None] * np.sqrt(
+            1 + 1 / n[:, None] + (t_futuro - t_medio[:, None]) ** 2 / sxx[:, None]
+        )
+
+    sin_datos = n < MIN_MESES_PROYECCION
+    proyeccion[sin_datos] = np.nan
+    ancho[sin_datos] = np.nan
+    return proyeccion, proyeccion - ancho, proyeccion + ancho, ultimo, np.where(sin_datos, np.nan, pendiente)
+
+
+def proyectar(frames, horizonte):
+    """Proyecta todos los clientes de ``frames`` ({codigo: DataFrame de leer_excel}).
+
+    Devuelve {codigo: {'meses': [...], concepto: {'meses', 'valor', 'inferior',
+    'superior', 'pendiente'}}}. Cada concepto se rotula desde su propio último
+    mes con dato; ``meses`` del cliente es el de Ventas. Los clientes sin datos
+    suficientes de Ventas no aparecen.
+    """
+    matriz = construir_matriz(frames)
+    if not matriz.meses or horizonte < 1:
+        return {}
+
+    series = _series(matriz)
+    n_conceptos, n_clientes, n_meses = series.shape
+    proyeccion, inferior, superior, ultimo, pendiente = ajustar_y_proyectar(
+        series.reshape(-1, n_meses), matriz.meses, horizonte
+    )
+    forma = (n_conceptos, n_clientes, horizonte)
+    proyeccion, inferior, superior = (a.reshape(forma) for a in (proyeccion, inferior, superior))
+    ultimo = ultimo.reshape(n_conceptos, n_clientes)
+    pendiente = pendiente.reshape(n_conceptos, n_clientes)
+
+    def meses_desde(k, i):
+        desde = pd.Period(matriz.meses[ultimo[k, i]], freq='M')
+        return [str(desde + h) for h in range(1, horizonte + 1)]
+
+    resultado = {}
+    for i, codigo in enumerate(matriz.codigos):
+        if np.isnan(proyeccion[0, i]).all():
+            continue
+        resultado[codigo] = {'meses': meses_desde(0, i)}
+        for k, concepto in enumerate(CONCEPTOS_PROYECCION):
+            resultado[codigo][concepto] = {
+                'meses': meses_desde(k, i),
+                'valor': proyeccion[k, i].tolist(),
+                'inferior': inferior[k, i].tolist(),
+                'superior': superior[k, i].tolist(),
+                'pendiente': float(pendiente[k, i]),
+            }
+    return resultado